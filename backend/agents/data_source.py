@@ -1,70 +1,219 @@
 
 import os
+import asyncio
+import glob
+import hashlib
+import math
+import re
 import pandas as pd
-import json
 import faiss
 import numpy as np
 
-from typing import Dict, List
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from typing import Dict, List, Optional, Tuple
 from models.schemas import Property
+from utils.cache import QUERY_CACHE_MAXSIZE, QUERY_CACHE_TTL, normalize_query
+from cachetools import TTLCache
 from sentence_transformers import SentenceTransformer
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Process-wide DataSourceAgent; see DataSourceAgent.get()
+_instance = None
+_instance_lock = asyncio.Lock()
+
+# A number with optional thousands separators and a k/m/million suffix, e.g. "RM1.2m", "500,000"
+_AMOUNT_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k|mil(?:lion)?|m)?\b', re.IGNORECASE)
+
+# Leave half the cores to the encoder and the event loop; FAISS searches are batched below
+faiss.omp_set_num_threads(max(1, (os.cpu_count() or 1) // 2))
+
+
+class _QueryBatcher:
+    """
+    Coalesces concurrent single-query searches into one batched FAISS search.
+    
+    Queries are collected for up to MAX_WAIT_SECONDS or until MAX_BATCH_SIZE are queued,
+    then searched together off the event loop. FAISS releases the GIL during search.
+    """
+
+    MAX_BATCH_SIZE = 32
+    MAX_WAIT_SECONDS = 0.005
+
+    def __init__(self, index):
+        self.index = index
+        self._pending = []
+        self._flush_handle = None
+        self._running = set()
+        # Reusable (MAX_BATCH_SIZE, d) float32 query buffers, one per batch in flight
+        self._free_buffers = []
+
+    async def search(self, query_embedding: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Queue a query for the next batched search.
+        
+        Args:
+            query_embedding: A (1, dim) float32 query vector
+            top_k: Number of neighbours to return
+            
+        Returns:
+            The ids of the top_k nearest neighbours, with -1 for empty slots
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query_embedding, top_k, future))
+        if len(self._pending) >= self.MAX_BATCH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.MAX_WAIT_SECONDS, self._flush)
+        return await future
+
+    def _flush(self):
+        """Hand the queued queries to a background batched search."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._search_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _search_batch(self, batch: List[Tuple[np.ndarray, int, asyncio.Future]]):
+        """Run one index.search over the whole batch and resolve each query's future with its row."""
+        # Fill a scratch buffer in place instead of allocating a new query matrix per batch
+        buffer = self._free_buffers.pop() if self._free_buffers else np.empty((self.MAX_BATCH_SIZE, self.index.d), dtype=np.float32)
+        for row, (query_embedding, _, _) in enumerate(batch):
+            np.copyto(buffer[row], query_embedding[0])
+        # Search with the largest k in the batch; smaller requests take a prefix of their row
+        k = max(top_k for _, top_k, _ in batch)
+        try:
+            _, indices = await asyncio.to_thread(self.index.search, buffer[:len(batch)], k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._free_buffers.append(buffer)
+        for row, (_, top_k, future) in zip(indices, batch):
+            if not future.done():
+                future.set_result(row[:top_k])
+
 
 class DataSourceAgent:
     """
     Agent for handling property data source integration and property data retrieval.
     This agent serves as a bridge between the raw property data and the other agents,
     ensuring consistent data access and formatting.
+    
+    The agent is a process-wide singleton: every DataSourceAgent() call returns the same
+    instance, and the encoder and FAISS index are loaded once by warm_up().
     """
+
+    # Catalogs below this size use an HNSW graph over int8 (SQ8) vectors; larger ones use IVF-PQ
+    HNSW_MAX_CATALOG_SIZE = 50_000
+    # Search-time tunables: higher values trade query latency for recall
+    HNSW_EF_SEARCH = 64
+    IVF_NPROBE = 16
+
+    EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+    # Dynamically quantized int8 ONNX export published alongside the model on the Hugging Face Hub
+    ONNX_MODEL_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+    
+    def __new__(cls):
+        global _instance
+        if _instance is None:
+            _instance = super().__new__(cls)
+            _instance._initialized = False
+        return _instance
     
     def __init__(self):
+        if self._initialized:
+            return
         self.excel_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
                                       "scraper", "properties.xlsx")
         self.index_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
                                       "backend", "faiss_index")
         # Load data
+        self._df = None
         self.properties_data = self._load_data()
-        self.embeddings_model = SentenceTransformer('all-MiniLM-L6-v2') 
-
-        print(self.index_path)
-        # Create or load vector store if OpenAI API key is available
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if openai_api_key and self.properties_data:
-            self.embeddings = OpenAIEmbeddings()
-            if os.path.exists(self.index_path):
-                print("Loading FAISS index from disk.")
-                self.vector_store = FAISS.load_local(
-                    self.index_path, self.embeddings, allow_dangerous_deserialization=True
-                )   
-            else:
-                print("Creating new FAISS index.")
-                # print(self.properties_data)
-                self.vector_store = FAISS.from_texts(
-                    [json.dumps(prop) for prop in self.properties_data],
-                    self.embeddings
-                )
-                if self.vector_store is not None:  # Ensure it's a valid index
-                    self.vector_store.save_local("faiss_index")
-        else:
-            self.vector_store = None
-            if not openai_api_key:
-                print("Warning: OpenAI API key not found. Vector search capabilities will be limited.")
+        # Property models are built once here; searches only index into this list.
+        # Entries are None for rows that fail validation (e.g. missing price).
+        self._property_models = self._build_property_models()
+        # Sparse TF-IDF matrix for the keyword search fallback
+        self._tfidf, self._tfidf_matrix = self._build_keyword_index()
+        # Encoder and vector index are loaded by warm_up()
+        self.embeddings_model = None
+        self.embeddings_backend = None
+        self.index = None
+        self._batcher = None
+        # Recent query embeddings keyed by normalized query (the encoder is uncased)
+        self._query_embeddings = TTLCache(maxsize=QUERY_CACHE_MAXSIZE, ttl=QUERY_CACHE_TTL)
+        self._initialized = True
+
+    @classmethod
+    def warm_up(cls) -> "DataSourceAgent":
+        """
+        Load the sentence encoder and the FAISS index, once per process.
+        
+        Returns:
+            The process-wide DataSourceAgent
+        """
+        agent = cls()
+        if agent.embeddings_model is None:
+            embeddings_model, agent.embeddings_backend = agent._load_embeddings_model()
+            # Pay one-off session setup and compilation costs before the first request
+            embeddings_model.encode(["warmup"], show_progress_bar=False)
+
+            # Build or load an inner-product index over the locally encoded properties.
+            # Embeddings are L2-normalised, so inner product equals cosine similarity.
+            agent.embeddings_model = embeddings_model
+            agent.index = agent._build_index() if agent.properties_data else None
+            agent._batcher = _QueryBatcher(agent.index) if agent.index is not None else None
+            if agent.index is None:
+                print("Warning: No property data available. Vector search capabilities will be limited.")
+        return agent
+
+    @classmethod
+    async def get(cls) -> "DataSourceAgent":
+        """
+        Return the process-wide DataSourceAgent, warming it up off the event loop on first use.
+        
+        Returns:
+            The process-wide DataSourceAgent
+        """
+        async with _instance_lock:
+            if _instance is None or _instance.embeddings_model is None:
+                return await asyncio.to_thread(cls.warm_up)
+            return _instance
     
     def _load_data(self) -> List[Dict]:
         """
-        Load property data from Excel.
+        Load property data from Excel, via a Parquet copy that is refreshed whenever the Excel file changes.
         
         Returns:
             List of property dictionaries
         """
         try:
             if os.path.exists(self.excel_path):
-                print(f"Loading property data from Excel: {self.excel_path}")
-                df = pd.read_excel(self.excel_path)
+                parquet_path = os.path.splitext(self.excel_path)[0] + ".parquet"
+                if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(self.excel_path):
+                    print(f"Loading property data from Parquet cache: {parquet_path}")
+                    df = pd.read_parquet(parquet_path)
+                else:
+                    print(f"Loading property data from Excel: {self.excel_path}")
+                    df = pd.read_excel(self.excel_path)
+                    try:
+                        df.to_parquet(parquet_path, compression='zstd')
+                    except Exception as e:
+                        print(f"Could not write Parquet cache: {e}")
+                
+                # Columnar copy for vectorized filtering; row positions match properties_data
+                self._df = self._build_filter_frame(df)
                 
                 # Convert DataFrame to list of dictionaries
                 properties = df.replace({np.nan: None}).to_dict('records')
+                for prop in properties:
+                    self._fill_defaults(prop)
                 
                 return properties
             else:
@@ -74,28 +223,336 @@ class DataSourceAgent:
         except Exception as e:
             print(f"Error loading property data: {e}")
             return []
+
+    @staticmethod
+    def _build_filter_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Build the columns get_properties filters on, with numeric columns coerced once up front.
+        
+        Args:
+            df: The property data as loaded from Excel or Parquet
+            
+        Returns:
+            DataFrame with a default RangeIndex, so row positions match properties_data
+        """
+        columns = {}
+        for column in ["asked_price", "num_bedrooms", "num_bathrooms"]:
+            values = df[column] if column in df else pd.Series(np.nan, index=df.index)
+            columns[column] = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+        for column in ["property_desc", "address", "property_type"]:
+            values = df[column] if column in df else pd.Series("", index=df.index)
+            columns[column] = values.fillna("").astype(str).str.lower().to_numpy()
+        return pd.DataFrame(columns)
+
+    @staticmethod
+    def _parse_amount(value) -> Optional[float]:
+        """
+        Parse a number from a filter value such as 500000, "RM500k", "1,200,000" or "1.2 million".
+        
+        Args:
+            value: The raw filter value
+            
+        Returns:
+            The number, or None if the value has no number in it
+        """
+        if value is None or isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return float(value)
+        match = _AMOUNT_RE.search(str(value))
+        if not match:
+            return None
+        amount = float(match.group(1).replace(',', ''))
+        suffix = (match.group(2) or "").lower()
+        if suffix == "k":
+            amount *= 1_000
+        elif suffix:
+            amount *= 1_000_000
+        return amount
+
+    @staticmethod
+    def _fill_defaults(prop: Dict) -> None:
+        """
+        Fill in missing fields in place so the record can be converted to a Property model.
+        
+        Args:
+            prop: Dictionary containing property data
+        """
+        # Ensure required fields exist
+        for field in ["property_desc", "address", "asked_price", "agent", "link"]:
+            if prop.get(field) is None:
+                prop[field] = ""
+        
+        # Handle prop_details field
+        if "prop_details" not in prop:
+            # Create prop_details from individual fields
+            prop["prop_details"] = {
+                "propertyType": prop.get("property_type", ""),
+                "floorSize": prop.get("floor_size_sqft", ""),
+                "numberOfBedrooms": prop.get("num_bedrooms", 0),
+                "numberOfBathrooms": prop.get("num_bathrooms", 0),
+                "lotType": prop.get("lot_type", "")
+            }
+
+    def _build_property_models(self) -> List[Optional[Property]]:
+        """
+        Convert every loaded property to a Property model.
+        
+        Returns:
+            List aligned with properties_data, with None for rows that fail validation
+        """
+        models = []
+        for prop in self.properties_data:
+            try:
+                models.append(self._to_property_model(prop))
+            except ValueError as e:
+                print(f"Skipping invalid property {prop.get('link')}: {e}")
+                models.append(None)
+        return models
+
+    def _build_keyword_index(self):
+        """
+        Fit a TF-IDF vectorizer over the string fields of every property.
+        
+        Returns:
+            Tuple of (fitted TfidfVectorizer, sparse document-term matrix), or (None, None) if there is no text
+        """
+        if not self.properties_data:
+            return None, None
+        corpus = [' '.join(v for v in prop.values() if isinstance(v, str)) for prop in self.properties_data]
+        vectorizer = TfidfVectorizer(lowercase=True, ngram_range=(1, 2))
+        try:
+            return vectorizer, vectorizer.fit_transform(corpus)
+        except ValueError as e:
+            print(f"Error building keyword index: {e}")
+            return None, None
+
+    def _load_embeddings_model(self) -> Tuple[SentenceTransformer, str]:
+        """
+        Load the sentence encoder on ONNX Runtime with int8 weights, falling back to PyTorch.
+        
+        Returns:
+            Tuple of (encoder, backend identifier)
+        """
+        try:
+            model = SentenceTransformer(
+                self.EMBEDDING_MODEL_NAME,
+                backend="onnx",
+                model_kwargs={"file_name": self.ONNX_MODEL_FILE}
+            )
+            return model, f"onnx:{self.ONNX_MODEL_FILE}"
+        except Exception as e:
+            print(f"ONNX encoder unavailable, falling back to PyTorch: {e}")
+            return self._load_torch_model(), "torch"
+
+    def _load_torch_model(self) -> SentenceTransformer:
+        """
+        Load the sentence encoder on PyTorch, compiled with torch.compile where available.
+        
+        Returns:
+            The PyTorch sentence encoder
+        """
+        import torch  # Only needed on the fallback path
+
+        # Leave cores for FAISS and the request threads instead of oversubscribing the CPU
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // 2))
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Can only be set before the first parallel op in the process
+            pass
+
+        model = SentenceTransformer(self.EMBEDDING_MODEL_NAME)
+        eager_model = model[0].auto_model
+        try:
+            # dynamic=True avoids a recompile for every new padded sequence length
+            model[0].auto_model = torch.compile(eager_model, backend="inductor", dynamic=True)
+            # Compilation is lazy, so run one forward pass here to surface compile errors
+            model.encode(["warmup"], show_progress_bar=False)
+        except Exception as e:
+            print(f"torch.compile unavailable, using the eager encoder: {e}")
+            model[0].auto_model = eager_model
+        return model
+
+    @staticmethod
+    def _property_text(prop: Dict) -> str:
+        """
+        Build the text that represents a property in the embedding space.
+        
+        Args:
+            prop: Dictionary containing property data
+            
+        Returns:
+            A plain-text description of the property
+        """
+        parts = [
+            prop.get("property_desc"),
+            prop.get("address"),
+            prop.get("property_type"),
+            prop.get("floor_size_sqft"),
+        ]
+        if prop.get("num_bedrooms"):
+            parts.append(f"{prop['num_bedrooms']:g} bedrooms")
+        if prop.get("num_bathrooms"):
+            parts.append(f"{prop['num_bathrooms']:g} bathrooms")
+        parts.append(prop.get("lot_type"))
+        parts.append(prop.get("agent_desc"))
+        return ". ".join(str(part) for part in parts if part)
+
+    def _index_factory_string(self, num_properties: int) -> str:
+        """
+        Choose the FAISS index type for the catalog size.
+        
+        Args:
+            num_properties: Number of vectors that will be indexed
+            
+        Returns:
+            A faiss.index_factory description string
+        """
+        if num_properties < self.HNSW_MAX_CATALOG_SIZE:
+            # SQ8 stores one byte per dimension, a 4x saving over float32
+            return "HNSW32,SQ8"
+        return f"IVF{int(4 * math.sqrt(num_properties))},PQ32x8"
+
+    def _cache_file(self, extension: str, *key_parts: str) -> str:
+        """
+        Path of a persisted search artifact for the current Excel file and encoder.
+        
+        Args:
+            extension: File extension of the artifact (e.g. "index", "npy")
+            key_parts: Extra values the artifact depends on, such as the index type
+            
+        Returns:
+            Path keyed on the Excel file's mtime and size, the encoder backend and key_parts
+        """
+        stat = os.stat(self.excel_path)
+        key_source = ":".join([str(stat.st_mtime_ns), str(stat.st_size), self.embeddings_backend, *key_parts])
+        key = hashlib.sha1(key_source.encode()).hexdigest()[:16]
+        return os.path.join(self.index_path, f"properties-{key}.{extension}")
+
+    def _tune_index(self, index: faiss.Index) -> None:
+        """Apply search-time parameters to an HNSW or IVF index."""
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = self.HNSW_EF_SEARCH
+        else:
+            faiss.extract_index_ivf(index).nprobe = self.IVF_NPROBE
+
+    def _encode_properties(self) -> np.ndarray:
+        """
+        Encode all properties in a single batch, reusing the cached matrix when the data is unchanged.
+        
+        SentenceTransformer.encode sorts the texts by length before batching, so one call
+        over the whole catalog keeps padding per mini-batch to a minimum.
+        
+        Returns:
+            float32 matrix of L2-normalised embeddings, one row per property
+        """
+        embeddings_file = self._cache_file("npy")
+        if os.path.exists(embeddings_file):
+            print(f"Loading property embeddings from disk: {embeddings_file}")
+            return np.load(embeddings_file)
+
+        texts = [self._property_text(prop) for prop in self.properties_data]
+        embeddings = self.embeddings_model.encode(
+            texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype('float32')
+        self._save_artifact(embeddings_file, lambda path: np.save(path, embeddings))
+        return embeddings
+
+    def _build_index(self) -> faiss.Index:
+        """
+        Load the persisted FAISS index, or build it from the property embeddings.
+        
+        Returns:
+            FAISS inner-product index whose ids match positions in properties_data
+        """
+        factory_string = self._index_factory_string(len(self.properties_data))
+        index_file = self._cache_file("index", factory_string)
+
+        if os.path.exists(index_file):
+            print(f"Loading FAISS index from disk: {index_file}")
+            index = faiss.read_index(index_file)
+        else:
+            print(f"Creating new FAISS index ({factory_string}).")
+            embeddings = self._encode_properties()
+            index = faiss.index_factory(embeddings.shape[1], factory_string, faiss.METRIC_INNER_PRODUCT)
+            if not index.is_trained:
+                index.train(embeddings)
+            index.add(embeddings)
+            self._save_artifact(index_file, lambda path: faiss.write_index(index, path))
+
+        self._tune_index(index)
+        return index
+
+    def _save_artifact(self, path: str, write) -> None:
+        """
+        Persist a search artifact, removing ones of the same kind built from older data.
+        
+        Args:
+            path: Destination path produced by _cache_file
+            write: Callable that writes the artifact to the given path
+        """
+        try:
+            os.makedirs(self.index_path, exist_ok=True)
+            extension = os.path.splitext(path)[1]
+            for stale_file in glob.glob(os.path.join(self.index_path, f"properties-*{extension}")):
+                os.remove(stale_file)
+            write(path)
+        except Exception as e:
+            print(f"Error saving {path}: {e}")
         
     async def get_properties(self, filters: Dict = None) -> List[Property]:
         """
         Retrieve properties based on the specified filters.
         
         Args:
-            filters: Dictionary of property filters (e.g., location, price range, etc.)
+            filters: Dictionary of property filters. Supported keys are price_max/max_price,
+                price_min/min_price, min_bedrooms/number_of_bedrooms/bedrooms, location
+                and property_type; other keys are ignored.
             
         Returns:
-            List of Property objects
+            List of up to 10 matching Property objects
         """
-        if not self.properties_data:
+        if self._df is None:
             return []
-            
-        filtered_properties = self.properties_data
         
-        # # Apply filters if provided
-        # if filters:
-        #     filtered_properties = self._apply_filters(filtered_properties, filters)
+        # Start from the rows that produced a valid Property model
+        mask = np.fromiter((model is not None for model in self._property_models), dtype=bool, count=len(self._property_models))
         
-        # Convert to Property objects
-        return [self._to_property_model(prop) for prop in filtered_properties[:10]]  # Limit to 10 for performance
+        # Apply filters if provided, as one vectorized mask per predicate
+        if filters:
+            price_max = self._parse_amount(filters.get("price_max", filters.get("max_price")))
+            if price_max is not None:
+                mask &= self._df["asked_price"].to_numpy() <= price_max
+            
+            price_min = self._parse_amount(filters.get("price_min", filters.get("min_price")))
+            if price_min is not None:
+                mask &= self._df["asked_price"].to_numpy() >= price_min
+            
+            # A requested bedroom count is treated as a minimum
+            bedrooms = self._parse_amount(
+                filters.get("min_bedrooms", filters.get("number_of_bedrooms", filters.get("bedrooms")))
+            )
+            if bedrooms is not None:
+                mask &= self._df["num_bedrooms"].to_numpy() >= bedrooms
+            
+            location = filters.get("location")
+            if isinstance(location, str) and location.strip():
+                location = location.strip().lower()
+                mask &= (
+                    self._df["address"].str.contains(location, regex=False).to_numpy()
+                    | self._df["property_desc"].str.contains(location, regex=False).to_numpy()
+                )
+            
+            property_type = filters.get("property_type")
+            if isinstance(property_type, str) and property_type.strip():
+                mask &= self._df["property_type"].str.contains(property_type.strip().lower(), regex=False).to_numpy()
+        
+        return [self._property_models[i] for i in np.flatnonzero(mask)[:10]]  # Limit to 10 for performance
     
     async def search_similar_properties(self, query: str, filters: Dict = None, user_context: Dict = None, top_k: int = 5) -> List[Property]:
         """
@@ -110,19 +567,22 @@ class DataSourceAgent:
         Returns:
             List of Property objects similar to the query
         """
-        if not self.vector_store:
-            # Fallback to simple keyword search if vector store is not available
+        if self.embeddings_model is None:
+            await DataSourceAgent.get()
+        
+        if self._batcher is None:
+            # Fallback to simple keyword search if the vector index is not available
             return await self._keyword_search(query, top_k)
         
         try:
-            # Perform vector similarity search
-            results = self.vector_store.similarity_search(query, k=top_k)
+            # Perform vector similarity search, batched with any concurrent searches
+            query_embedding = self.encode_query(query)
+            indices = await self._batcher.search(query_embedding, top_k)
             
-            # Extract property data from results
-            similar_properties = []
-            for doc in results:
-                property_data = json.loads(doc.page_content)
-                similar_properties.append(self._to_property_model(property_data))
+            # FAISS ids are positions in properties_data; -1 marks an empty slot
+            similar_properties = [
+                self._property_models[i] for i in indices if i >= 0 and self._property_models[i] is not None
+            ]
             
             # Apply additional filtering based on filters and user context
             # if filters or user_context:
@@ -134,9 +594,31 @@ class DataSourceAgent:
             print(f"Error during vector search: {e}")
             return await self._keyword_search(query, top_k)
     
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query for vector search, reusing the vector of a recently seen normalized query.
+        
+        Args:
+            query: The natural language query to embed
+            
+        Returns:
+            A (1, dim) float32 array of the normalized query embedding
+        """
+        key = normalize_query(query)
+        query_embedding = self._query_embeddings.get(key)
+        if query_embedding is None:
+            query_embedding = self.embeddings_model.encode(
+                [key],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ).astype('float32')
+            self._query_embeddings[key] = query_embedding
+        return query_embedding
+    
     async def _keyword_search(self, query: str, top_k: int = 5) -> List[Property]:
         """
-        Fallback search method using simple keyword matching.
+        Fallback search method using TF-IDF keyword matching.
         
         Args:
             query: Search query
@@ -145,60 +627,40 @@ class DataSourceAgent:
         Returns:
             List of matching Property objects
         """
-        # Convert query to lowercase for case-insensitive matching
-        query_lower = query.lower()
-        
-        # Simple scoring function: count occurrences of query terms in property data
-        def score_property(prop):
-            # Convert all string values to lowercase and join
-            text = ' '.join([str(v).lower() for v in prop.values() if isinstance(v, str)])
-            return sum(term in text for term in query_lower.split())
+        if self._tfidf is None:
+            return []
         
-        # Score and sort properties
-        scored_properties = [(prop, score_property(prop)) for prop in self.properties_data]
-        scored_properties.sort(key=lambda x: x[1], reverse=True)
+        # Cosine similarity between the query and every property in one sparse product
+        query_vector = self._tfidf.transform([query])
+        scores = (self._tfidf_matrix @ query_vector.T).toarray().ravel()
         
-        # Return top k properties
-        top_properties = [self._to_property_model(prop) for prop, score in scored_properties[:top_k] if score > 0]
+        # Select the top k without fully sorting the catalog
+        k = min(top_k, len(scores))
+        top_indices = np.argpartition(-scores, k - 1)[:k]
+        top_indices = top_indices[np.argsort(-scores[top_indices], kind='stable')]
         
-        return top_properties
+        return [
+            self._property_models[i] for i in top_indices
+            if scores[i] > 0 and self._property_models[i] is not None
+        ]
     
     def _to_property_model(self, property_dict: Dict) -> Property:
         """
         Convert property dictionary to Property model.
         
         Args:
-            property_dict: Dictionary containing property data
+            property_dict: Dictionary containing property data, with defaults filled by _fill_defaults
             
         Returns:
             Property model
         """
-        # Create a copy of the dictionary to avoid modifying the original
-        prop_data = property_dict.copy()
-        
-        # Ensure required fields exist
-        for field in ["property_desc", "address", "asked_price", "agent", "link"]:
-            if field not in prop_data or prop_data[field] is None:
-                prop_data[field] = ""
-        
-        # Handle prop_details field
-        if "prop_details" not in prop_data:
-            # Create prop_details from individual fields
-            prop_data["prop_details"] = {
-                "propertyType": prop_data.get("property_type", ""),
-                "floorSize": prop_data.get("floor_size_sqft", ""),
-                "numberOfBedrooms": prop_data.get("num_bedrooms", 0),
-                "numberOfBathrooms": prop_data.get("num_bathrooms", 0),
-                "lotType": prop_data.get("lot_type", "")
-            }
-        
         # Create Property model
         return Property(
-            property_desc=prop_data["property_desc"],
-            address=prop_data["address"],
-            price=prop_data["asked_price"],
-            prop_details=prop_data["prop_details"],
-            agent=prop_data["agent"],
-            link=prop_data.get("link", ""),  # Assuming 'link' is optional
-            agent_desc=prop_data.get("agent_desc", "")
+            property_desc=property_dict["property_desc"],
+            address=property_dict["address"],
+            price=property_dict["asked_price"],
+            prop_details=property_dict["prop_details"],
+            agent=property_dict["agent"],
+            link=property_dict.get("link", ""),  # Assuming 'link' is optional
+            agent_desc=property_dict.get("agent_desc", "")
         )
\ No newline at end of file
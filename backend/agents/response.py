@@ -1,12 +1,43 @@
 from typing import Dict, List, Optional
 from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnableSequence
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
 import os
-import json
+import orjson
 
 from models.schemas import PropertyQuery, AgentResponse, Property
+from utils.prompts import CompiledPrompt
+
+# Extra instructions used when the user is asking for property recommendations
+RECOMMENDATION_INSTRUCTIONS = """
+            SPECIAL INSTRUCTIONS FOR PROPERTY RECOMMENDATIONS:
+            This query is asking for property recommendations based on specific criteria.
+            
+            1. Format your response as a list of specific property recommendations with details
+            2. Start with a brief introduction summarizing what you found
+            3. Present each recommendation in a clear, structured way with:
+               - Property name and location
+               - Price
+               - Key features (bedrooms, size, amenities)
+               - Any unique selling points
+            4. End with a brief conclusion and follow-up question offering additional help
+            5. If you couldn't find specific properties meeting all criteria, acknowledge this and suggest alternatives
+            
+            EXAMPLE FORMATTING:
+            "Based on your criteria, I found several properties in [LOCATION] that match your requirements:
+            
+            **[PROPERTY NAME]**
+            - Price: RM [PRICE]
+            - [X] bedrooms, [Y] bathrooms
+            - [SIZE] sq ft
+            - [KEY FEATURES]
+            
+            **[PROPERTY NAME 2]**
+            - Price: RM [PRICE]
+            - [KEY DETAILS]
+            
+            Would you like more information about any of these properties?"
+            """
 
 class ResponseAgent:
     """Agent for generating natural language responses based on property data and analysis."""
@@ -19,9 +50,7 @@ class ResponseAgent:
         )
         
         # New prompt for natural language responses, now including chat history and chitchat flag
-        self.natural_language_prompt = PromptTemplate(
-            input_variables=["chat_history_str", "current_user_input", "validation_str", "properties_str", "web_search_data_str", "is_chitchat"],
-            template="""
+        self.natural_language_prompt = CompiledPrompt("""
             Previous Conversation History (if any):
             {chat_history_str}
             
@@ -56,11 +85,27 @@ class ResponseAgent:
                  - Maintain a formal and professional tone.
 
             Response:
-            """
+            """)
+        
+        # Recommendation variant of the prompt, with formatting instructions
+        # inserted after the Supporting Information section
+        self.recommendation_prompt = CompiledPrompt(
+            self._insert_recommendation_instructions(self.natural_language_prompt.template)
         )
+
+    @staticmethod
+    def _insert_recommendation_instructions(template: str) -> str:
+        """Return the template with RECOMMENDATION_INSTRUCTIONS inserted after the Supporting Information section."""
+        lines = template.split('\n')
+        insert_idx = 0
+        for i, line in enumerate(lines):
+            if "Supporting Information" in line:
+                insert_idx = i + 4  # Insert after this section and its explanation lines
+                break
         
-        # Create separate chains
-        self.natural_language_chain = self.natural_language_prompt | self.llm
+        if insert_idx > 0:
+            lines.insert(insert_idx, RECOMMENDATION_INSTRUCTIONS)
+        return '\n'.join(lines)
 
     async def generate_natural_language_response(
         self,
@@ -70,7 +115,8 @@ class ResponseAgent:
         web_search_data: Optional[Dict] = None,
         chat_history: Optional[List[BaseMessage]] = None,
         is_chitchat: bool = False,
-        is_recommendation_request: bool = False  # New parameter to handle recommendation formatting
+        is_recommendation_request: bool = False,  # New parameter to handle recommendation formatting
+        config: Optional[RunnableConfig] = None
     ) -> AgentResponse:
         """
         Generate a natural language response based on all available information, including chat history.
@@ -83,6 +129,7 @@ class ResponseAgent:
             chat_history: List of previous messages in the conversation.
             is_chitchat: Boolean flag indicating if the query is general chitchat.
             is_recommendation_request: Boolean flag indicating if this is a property recommendation request.
+            config: Optional runnable config from the calling graph node, so streamed tokens reach its callbacks.
             
         Returns:
             An AgentResponse object containing the response and relevant information.
@@ -102,47 +149,17 @@ class ResponseAgent:
         current_user_input = query # This is current_input from AgentState
 
         # Prepare other inputs for the prompt, making them descriptive for non-property queries
-        validation_str = json.dumps(validation, indent=2) if validation and not is_chitchat else "Not applicable or not a property query."
+        validation_str = orjson.dumps(validation, option=orjson.OPT_INDENT_2).decode() if validation and not is_chitchat else "Not applicable or not a property query."
         
-        properties_serializable = [prop.dict() for prop in properties] if properties and not is_chitchat else []
-        properties_str = json.dumps(properties_serializable, indent=2) if properties_serializable else "No specific properties found or not a property query."
+        # Property models are shared across requests, so each one is serialized only once
+        if properties and not is_chitchat:
+            properties_str = "[" + ",".join(prop.cached_json for prop in properties) + "]"
+        else:
+            properties_str = "No specific properties found or not a property query."
         
         # Check if this is a recommendation request with web search data
         is_recommendation_with_data = is_recommendation_request and web_search_data and web_search_data.get("web_search_results")
         
-        # Modify the prompt to handle recommendations specifically
-        recommendation_instruction = ""
-        if is_recommendation_request:
-            recommendation_instruction = """
-            SPECIAL INSTRUCTIONS FOR PROPERTY RECOMMENDATIONS:
-            This query is asking for property recommendations based on specific criteria.
-            
-            1. Format your response as a list of specific property recommendations with details
-            2. Start with a brief introduction summarizing what you found
-            3. Present each recommendation in a clear, structured way with:
-               - Property name and location
-               - Price
-               - Key features (bedrooms, size, amenities)
-               - Any unique selling points
-            4. End with a brief conclusion and follow-up question offering additional help
-            5. If you couldn't find specific properties meeting all criteria, acknowledge this and suggest alternatives
-            
-            EXAMPLE FORMATTING:
-            "Based on your criteria, I found several properties in [LOCATION] that match your requirements:
-            
-            **[PROPERTY NAME]**
-            - Price: RM [PRICE]
-            - [X] bedrooms, [Y] bathrooms
-            - [SIZE] sq ft
-            - [KEY FEATURES]
-            
-            **[PROPERTY NAME 2]**
-            - Price: RM [PRICE]
-            - [KEY DETAILS]
-            
-            Would you like more information about any of these properties?"
-            """
-        
         # Be careful with web_search_data structure; it might be a list of results or a complex dict.
         # For the prompt, a string representation is needed. If it's a list of search snippets, join them.
         # If it's a dict, json.dumps might be okay, but ensure it's what the LLM expects.
@@ -157,11 +174,11 @@ class ResponseAgent:
                     elif isinstance(search_results, dict) and search_results.get("summary"):
                         web_search_data_str = search_results.get("summary")
                     else:
-                        web_search_data_str = json.dumps(search_results, indent=2)
+                        web_search_data_str = orjson.dumps(search_results, option=orjson.OPT_INDENT_2).decode()
                 else:
                     # Regular formatting for non-recommendation web search
                     if isinstance(web_search_data["web_search_results"], dict):
-                        web_search_data_str = json.dumps(web_search_data["web_search_results"], indent=2)
+                        web_search_data_str = orjson.dumps(web_search_data["web_search_results"], option=orjson.OPT_INDENT_2).decode()
                     elif isinstance(web_search_data["web_search_results"], list):
                         snippets = [str(res) for res in web_search_data["web_search_results"][:3]]
                         web_search_data_str = '\n'.join(snippets) if snippets else web_search_data_str
@@ -173,28 +190,6 @@ class ResponseAgent:
             else:
                  web_search_data_str = str(web_search_data) # Generic fallback
 
-        # Add recommendation instructions to the prompt template if needed
-        prompt_template = self.natural_language_prompt.template
-        if is_recommendation_request:
-            # Insert recommendation instructions after the Supporting Information section
-            lines = prompt_template.split('\n')
-            insert_idx = 0
-            for i, line in enumerate(lines):
-                if "Supporting Information" in line:
-                    insert_idx = i + 4  # Insert after this section and its explanation lines
-                    break
-            
-            if insert_idx > 0:
-                lines.insert(insert_idx, recommendation_instruction)
-                prompt_template = '\n'.join(lines)
-        
-        # Create a new PromptTemplate with the possibly modified template
-        current_prompt = PromptTemplate(
-            input_variables=self.natural_language_prompt.input_variables,
-            template=prompt_template
-        )
-        current_chain = current_prompt | self.llm
-
         prompt_inputs = {
             "chat_history_str": chat_history_str,
             "current_user_input": current_user_input,
@@ -204,9 +199,13 @@ class ResponseAgent:
             "is_chitchat": is_chitchat
         }
         
-        # Generate natural language response
-        response_result = await current_chain.ainvoke(prompt_inputs)
-        response_text = response_result.content.strip()
+        # Generate natural language response, using the recommendation variant of the prompt if needed
+        prompt = self.recommendation_prompt if is_recommendation_request else self.natural_language_prompt
+        # Stream the completion so graph callers can forward tokens as they arrive
+        response_chunks = []
+        async for chunk in self.llm.astream(prompt.format(**prompt_inputs), config=config):
+            response_chunks.append(chunk.content)
+        response_text = "".join(response_chunks).strip()
 
         # Prepare additional information (mostly relevant for property queries)
         additional_info = {}
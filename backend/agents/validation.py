@@ -1,9 +1,17 @@
 from typing import Dict, Optional
 from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnableSequence
+import logging
 import os
-import json
+import string
+
+from utils.cache import async_query_cache
+from utils.json_parsing import extract_json
+from utils.prompts import CompiledPrompt
+
+# Normalizes extracted keys in one pass: "Property Type" -> "property_type"
+_KEY_TABLE = str.maketrans(string.ascii_uppercase + ' ', string.ascii_lowercase + '_')
+
+logger = logging.getLogger(__name__)
 
 class ValidationAgent:
     def __init__(self):
@@ -14,9 +22,7 @@ class ValidationAgent:
         )
         
         # Define prompt for extracting filters and user context
-        self.prompt = PromptTemplate(
-            input_variables=["query"],
-            template="""
+        self.prompt = CompiledPrompt("""
             Extract structured filters and user context from the following property query:
             
             User Query: {query}
@@ -38,47 +44,66 @@ class ValidationAgent:
                - Any other preferences or constraints
             
             Return the results in JSON format with two keys: "filters" and "user_context".
-            """
-        )
+            """)
+    
+    @staticmethod
+    def normalize_fields(fields: Dict) -> Dict:
+        """
+        Normalize extracted filter or user context keys and drop empty values.
         
-        # Create RunnableSequence instead of LLMChain
-        self.chain = self.prompt | self.llm
+        Args:
+            fields: Extracted fields, e.g. {"Property Type": "Condo", "Bathrooms": None}
+            
+        Returns:
+            The fields with snake_case keys and without None values, e.g. {"property_type": "Condo"}
+        """
+        return {
+            k.translate(_KEY_TABLE): v 
+            for k, v in fields.items() 
+            if v is not None
+        }
     
     async def validate(self, query: str) -> Dict:
         """
         Validate the property query and extract structured filters and user context.
+        Results are cached by normalized query, so repeated queries skip the LLM call.
+        """
+        extracted = await self._extract(query)
+        if extracted is None:
+            # Failed extractions aren't cached, so a repeat of the query retries the LLM
+            return {
+                "extracted_filters": {},
+                "extracted_user_context": {}
+            }
+        return extracted
+    
+    @async_query_cache()
+    async def _extract(self, query: str) -> Optional[Dict]:
+        """
+        Extract structured filters and user context from the query with the LLM.
+        
+        Returns:
+            Dict with extracted_filters and extracted_user_context, or None if the reply
+            couldn't be parsed
         """
         # Extract filters and user context from the query
         try:
-            extraction_result = await self.chain.ainvoke({"query": query})
-            json_str = extraction_result.content
-            if json_str.startswith('```json'):
-                json_str = json_str.split('```json')[1].split('```')[0].strip()
+            extraction_result = await self.llm.ainvoke(self.prompt.format(query=query))
 
             # Parse the JSON result from the message content
-            extracted_data = json.loads(json_str)
+            extracted_data = extract_json(extraction_result.content)
+            if extracted_data is None:
+                raise ValueError("No JSON object found in the reply")
             # print(f'Cleaned JSON data: {extracted_data}')
 
-            filters = {
-                k.lower().replace(' ', '_'): v 
-                for k, v in extracted_data.get("filters", {}).items() 
-                if v is not None
-            }
-            
-            user_context = {
-                k.lower().replace(' ', '_'): v 
-                for k, v in extracted_data.get("user_context", {}).items() 
-                if v is not None
-            }
+            filters = self.normalize_fields(extracted_data.get("filters", {}))
+            user_context = self.normalize_fields(extracted_data.get("user_context", {}))
             
             return {
                 "extracted_filters": filters,
                 "extracted_user_context": user_context
             }
         
-        except (json.JSONDecodeError, KeyError) as e:
-            print(f'JSON parsing error: {str(e)}')
-            return {
-                "extracted_filters": {},
-                "extracted_user_context": {}
-            }
\ No newline at end of file
+        except (ValueError, KeyError, AttributeError) as e:
+            logger.warning("JSON parsing error: %s", e)
+            return None
\ No newline at end of file
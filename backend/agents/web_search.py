@@ -1,10 +1,12 @@
 from typing import Dict, Optional, List
 from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnableSequence
 import os
-import json
+import orjson
 import traceback
+
+from utils.cache import async_query_cache
+from utils.prompts import CompiledPrompt
+
 class WebSearchAgent:
     """Agent for performing web searches to augment property information using GPT-4's search capabilities."""
     
@@ -15,9 +17,7 @@ class WebSearchAgent:
         )
         
         # Define search integration prompt
-        self.prompt = PromptTemplate(
-            input_variables=["query", "location"],
-            template="""
+        self.prompt = CompiledPrompt("""
             You are a property information specialist with access to real-time web search.
 
             User Query: {query}
@@ -45,16 +45,13 @@ class WebSearchAgent:
               "sources": ["...", "..."], // List of URLs or site names
               "confidence": "high" | "medium" | "low"
             }}
-            """
-        )
-        
-
-       
-        self.chain = self.prompt | self.llm
+            """)
     
+    @async_query_cache()
     async def search_web(self, query: str, location: str = None) -> Dict:
         """
         Perform a web search for property-related information using GPT-4's search capabilities.
+        Results are cached by normalized query and location, so repeated searches skip the LLM call.
         
         Args:
             query: The search query related to property information
@@ -65,13 +62,13 @@ class WebSearchAgent:
         """
         try:
             # Process and organize search results using GPT-4
-            result = await self.chain.ainvoke({
-                "query": query,
-                "location": location if location else "Not specified"
-            })
+            result = await self.llm.ainvoke(self.prompt.format(
+                query=query,
+                location=location if location else "Not specified"
+            ))
             
             try:
-                parsed = json.loads(result.content)
+                parsed = orjson.loads(result.content)
             except Exception:
                 parsed = {"raw": result.content}
             
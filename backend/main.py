@@ -1,15 +1,19 @@
-import traceback
+import asyncio
 import logging
-import json
+import orjson
 import re
 
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Optional, TypedDict, Annotated
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import Any, List, Dict, Optional, TypedDict, Annotated
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.checkpoint.memory import InMemorySaver
 
 from agents.validation import ValidationAgent
@@ -17,21 +21,31 @@ from agents.response import ResponseAgent
 from agents.web_search import WebSearchAgent
 from agents.data_source import DataSourceAgent
 from models.schemas import AgentResponse, Property
+from utils.cache import SemanticCache
+from utils.json_parsing import extract_json
 from utils.prompts import (
-    CONTEXT_EXTRACTION_PROMPT,
-    QUERY_CLASSIFICATION_PROMPT,
-    SEARCH_CRITERIA_PROMPT,
+    UNIFIED_TRIAGE_PROMPT,
     WEB_SEARCH_DECISION_PROMPT
 )
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the sentence encoder and FAISS index once per process, before the first request
+    await DataSourceAgent.get()
+    yield
+
 app = FastAPI(
     title="Property Multi-Agent System",
     description="A multi-agent system for property inquiries and analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Responses carry lists of properties; orjson serializes them faster than the stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware configuration
@@ -49,6 +63,60 @@ response_agent = ResponseAgent()
 web_search_agent = WebSearchAgent()
 data_source_agent = DataSourceAgent()
 
+# The triage prompt asks for a single JSON object; JSON mode guarantees the reply parses
+triage_llm = validation_agent.llm.bind(response_format={"type": "json_object"})
+
+# Replies to the triage and web search decision prompts, reused for paraphrased queries.
+# Tighter than the usual 0.1 distance because a triage reply carries the extracted criteria.
+llm_cache = SemanticCache(distance_threshold=0.05, ttl=3600)
+
+# Web search results, reused for paraphrased search queries with the same location and property type
+web_search_cache = SemanticCache(distance_threshold=0.1, ttl=3600)
+
+def embed_for_cache(query: str):
+    """Embed a query for a semantic cache lookup, or return None while the encoder is still loading."""
+    if data_source_agent.embeddings_model is None:
+        return None
+    return data_source_agent.encode_query(query)[0]
+
+async def cached_llm(prompt: str, namespace: str, context: str, query: str, llm=None):
+    """
+    Invoke the LLM through the semantic cache.
+    
+    Args:
+        prompt: The fully formatted prompt
+        namespace: Name of the prompt template
+        context: The prompt's inputs other than the query, which must match exactly for a cache hit
+        query: The user query, compared by embedding
+        llm: The model to call on a cache miss, defaulting to the validation agent's LLM
+        
+    Returns:
+        The LLM reply, possibly cached from a paraphrase of the query
+    """
+    llm = llm or validation_agent.llm
+    query_embedding = embed_for_cache(query)
+    if query_embedding is None:
+        # The encoder is loaded at start-up; until then, bypass the cache
+        return await llm.ainvoke(prompt)
+    
+    cached_reply = llm_cache.check(namespace, context, query, query_embedding)
+    if cached_reply is not None:
+        logger.info("Semantic cache hit for %s prompt", namespace)
+        return cached_reply
+    
+    reply = await llm.ainvoke(prompt)
+    llm_cache.store(namespace, context, query, query_embedding, reply)
+    return reply
+
+# Characters of formatted chat history kept in state for prompts
+CHAT_HISTORY_STR_MAX = 4096
+
+def append_chat_history_str(chat_history_str: str, message_type: str, content: str) -> str:
+    """Append one "type: content" line to the rolling chat transcript, keeping only its tail."""
+    line = f"{message_type}: {content}"
+    chat_history_str = f"{chat_history_str}\n{line}" if chat_history_str else line
+    return chat_history_str[-CHAT_HISTORY_STR_MAX:]
+
 class AgentState(TypedDict):
     current_input: str  # The user's most recent message for this turn
     filters: Optional[Dict]
@@ -56,8 +124,9 @@ class AgentState(TypedDict):
     relevant_properties: Optional[List[Property]]
     web_search_result: Optional[Dict]
     web_search_decision: Optional[str]
-    response: Optional[Dict] # API response
+    response: Optional[Any] # API response: the AgentResponse returned by the endpoint as-is
     chat_history: Annotated[List[BaseMessage], add_messages] # For LangGraph memory
+    chat_history_str: str # Rolling "type: content" transcript, bounded to the last CHAT_HISTORY_STR_MAX chars
     is_property_query: bool # Flag to indicate if current_input is property related
     target_property_name: Optional[str] # Specific property name user might be asking for
     property_exists: Optional[bool] # Whether the target_property_name exists in our known list
@@ -65,64 +134,128 @@ class AgentState(TypedDict):
     search_criteria: Optional[Dict] # Structured search criteria for recommendation requests
     conversation_context: Optional[Dict] # Context extracted from previous conversation for follow-up questions
 
-async def classify_input_node(state: AgentState) -> AgentState:
-    """Classify the input using LLM and update chat history."""
+# Messages that are unambiguously chitchat and never need the triage LLM. Bare "yes"/"ok" are
+# deliberately excluded: they are often answers to the assistant's follow-up questions.
+_CHITCHAT_RE = re.compile(
+    r'^\s*(hi|hello|hey|good (morning|afternoon|evening)|thanks|thank you|thanks a lot|bye|goodbye)[\s!.?]*$',
+    re.IGNORECASE
+)
+
+# Words that make a first-turn message clearly property-related
+_PROPERTY_KEYWORDS = frozenset({
+    "condo", "condos", "condominium", "apartment", "apartments", "property", "properties",
+    "house", "houses", "residence", "residences", "terrace", "bungalow", "semi", "studio", "penthouse",
+    "rent", "rental", "buy", "sell", "price", "prices", "rm", "psf", "sqft", "bedroom", "bedrooms",
+    "bathroom", "bathrooms", "developer", "freehold", "leasehold", "tenure", "maintenance",
+    "bangsar", "kiara", "klcc", "cheras", "ampang", "damansara", "petaling", "puchong", "subang"
+})
+
+# Phrasings that suggest a recommendation request, which needs search criteria from the LLM
+_RECOMMENDATION_RE = re.compile(
+    r'\b(recommend\w*|suggest\w*|best|top|find|search\w*|looking for|show me|list\w*|available|'
+    r'options?|under|below|less than|within|budget|affordable|cheap\w*)\b',
+    re.IGNORECASE
+)
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+async def classify_input_node(state: AgentState) -> Dict:
+    """
+    Triage the input with a single LLM call and update chat history.
+    
+    Returns a state update rather than the full state, so the add_messages reducer appends
+    the new message to chat_history instead of the whole history being rebuilt.
+    """
+    current_input = state["current_input"]
     # Get the full chat history from checkpointer before appending the new message
     previous_chat_history = state.get("chat_history", [])
     
     # Add the current input to chat history
-    state["chat_history"] = previous_chat_history + [HumanMessage(content=state["current_input"])]
-    
-    # Extract contextual information from previous messages if this appears to be a follow-up
-    if previous_chat_history and len(state["current_input"].split()) < 15:  # Short query might be a follow-up
-        # Look at previous messages for context
-        conversation_history = ' '.join([f"{msg.type}: {msg.content}" for msg in previous_chat_history[-3:]])
-        context_extraction_prompt = CONTEXT_EXTRACTION_PROMPT.format(
-            conversation_history=conversation_history,
-            current_query=state["current_input"]
-        )
-        
-        try:
-            context_result = await validation_agent.llm.ainvoke(context_extraction_prompt)
-            
-            if hasattr(context_result, 'content'):
-                context_text = context_result.content.strip()
-            else:
-                context_text = str(context_result).strip()
-            
-            json_match = re.search(r'\{[\s\S]*\}', context_text)
-            if json_match:
-                context_json = json.loads(json_match.group(0))
-                state["conversation_context"] = context_json
-                logging.info(f"Extracted conversation context: {context_json}")
-                
-                # If this is a follow-up about a property, set target_property_name
-                if context_json.get("is_follow_up") and context_json.get("referenced_property"):
-                    state["target_property_name"] = context_json.get("referenced_property")
-                    logging.info(f"Set target_property_name from conversation context: {state['target_property_name']}")
-        except Exception as e:
-            logging.error(f"Error extracting conversation context: {e}")
-            state["conversation_context"] = None
-    
-    # Use the LLM to classify if this is a property-related query and if it's a recommendation request
-    classification_prompt = QUERY_CLASSIFICATION_PROMPT.format(user_message=state["current_input"])
-    
-    classification_result = await validation_agent.llm.ainvoke(classification_prompt)
-    
-    # Extract the decision from the LLM response
-    if hasattr(classification_result, 'content'):
-        classification_text = classification_result.content.strip().lower()
+    update = {
+        "chat_history": [HumanMessage(content=current_input)],
+        "chat_history_str": append_chat_history_str(state.get("chat_history_str", ""), "human", current_input)
+    }
+    
+    # Decide the easy cases without the LLM
+    if _CHITCHAT_RE.match(current_input):
+        update["is_property_query"] = False
+        update["is_recommendation_request"] = False
+        logger.info("Input classified as chitchat by keyword pre-filter")
+        return update
+    
+    # A first-turn property question that is not a recommendation request needs neither
+    # follow-up context nor search criteria, so the keyword match is all triage would add
+    if (
+        not previous_chat_history
+        and not _RECOMMENDATION_RE.search(current_input)
+        and not _PROPERTY_KEYWORDS.isdisjoint(_WORD_RE.findall(current_input.lower()))
+    ):
+        update["is_property_query"] = True
+        update["is_recommendation_request"] = False
+        logger.info("Input classified as a property query by keyword pre-filter")
+        return update
+    
+    # Only short queries with history are treated as possible follow-ups
+    check_follow_up = bool(previous_chat_history) and len(current_input.split()) < 15
+    if check_follow_up:
+        # Look at the last few previous messages for context
+        recent_messages = previous_chat_history[-3:]
+        conversation_history = '\n'.join([f"{msg.type}: {msg.content}" for msg in recent_messages])
     else:
-        classification_text = str(classification_result).strip().lower()
+        conversation_history = "No previous messages."
+    
+    # One LLM call classifies the query, extracts follow-up context and, for recommendation
+    # requests, the search criteria
+    triage_prompt = UNIFIED_TRIAGE_PROMPT.format(
+        conversation_history=conversation_history,
+        user_message=current_input
+    )
+    triage_result = await cached_llm(triage_prompt, "triage", conversation_history, current_input, llm=triage_llm)
+    
+    if hasattr(triage_result, 'content'):
+        triage_text = triage_result.content.strip()
+    else:
+        triage_text = str(triage_result).strip()
+    
+    triage = extract_json(triage_text)
+    if triage is None:
+        logger.error("Error parsing triage result: %s", triage_text)
+        triage = {}
     
     # Set the property query flag based on LLM classification
-    state["is_property_query"] = "property: yes" in classification_text
+    update["is_property_query"] = bool(triage.get("property"))
     
     # Set a new flag for recommendation requests
-    state["is_recommendation_request"] = "recommendation: yes" in classification_text
+    update["is_recommendation_request"] = bool(triage.get("recommendation"))
     
-    logging.info(f"Input classified as property-related: {state['is_property_query']}, recommendation request: {state.get('is_recommendation_request', False)}")
-    return state
+    if check_follow_up:
+        context_json = {
+            "is_follow_up": bool(triage.get("follow_up")),
+            "referenced_property": triage.get("referenced_property"),
+            "referenced_location": triage.get("referenced_location"),
+            "referenced_features": triage.get("referenced_features") or []
+        }
+        update["conversation_context"] = context_json
+        logger.info("Extracted conversation context: %s", context_json)
+        
+        # If this is a follow-up about a property, set target_property_name
+        if context_json["is_follow_up"] and context_json["referenced_property"]:
+            update["target_property_name"] = context_json["referenced_property"]
+            logger.info("Set target_property_name from conversation context: %s", update['target_property_name'])
+    
+    # Search criteria, filters and user context are only extracted for recommendation requests
+    if update["is_recommendation_request"] and isinstance(triage.get("search_criteria"), dict):
+        update["search_criteria"] = triage["search_criteria"]
+        logger.info("Extracted search criteria: %s", update['search_criteria'])
+        if isinstance(triage.get("filters"), dict):
+            update["filters"] = ValidationAgent.normalize_fields(triage["filters"])
+            update["user_context"] = ValidationAgent.normalize_fields(triage.get("user_context") or {})
+    
+    logger.info(
+        "Input classified as property-related: %s, recommendation request: %s",
+        update['is_property_query'], update['is_recommendation_request']
+    )
+    return update
 
 def decide_initial_route(state: AgentState) -> str:
     """Determine the next step based on query classification."""
@@ -131,54 +264,46 @@ def decide_initial_route(state: AgentState) -> str:
     else:
         return "generate_response" # Directly generate a conversational response
 
-async def validate_input(state: AgentState) -> AgentState:
-    """Validate and extract information from the user's query, including a target property name and search criteria."""
-    validation_result = await validation_agent.validate(state["current_input"])
-    state["filters"] = validation_result.get("extracted_filters", {})
-    state["user_context"] = validation_result.get("extracted_user_context", {})
+# Known property names users refer to informally, as {regex: canonical name}
+KNOWN_PROPERTY_ALIASES = {
+    r'river\s*park': "River Park Bangsar South",
+}
+_KNOWN_PROPERTY_ALIAS_RES = [
+    (re.compile(pattern, re.IGNORECASE), canonical_name) for pattern, canonical_name in KNOWN_PROPERTY_ALIASES.items()
+]
 
-    # If this is a recommendation request, extract detailed search criteria
-    if state.get("is_recommendation_request"):
-        # Extract detailed search criteria with an LLM
-        search_criteria_prompt = SEARCH_CRITERIA_PROMPT.format(user_request=state["current_input"])
-        
-        criteria_result = await validation_agent.llm.ainvoke(search_criteria_prompt)
-        
-        # Extract the JSON from the LLM response
-        try:
-            if hasattr(criteria_result, 'content'):
-                criteria_text = criteria_result.content.strip()
-            else:
-                criteria_text = str(criteria_result).strip()
+async def validate_input(state: AgentState) -> AgentState:
+    """Validate and extract information from the user's query, including a target property name."""
+    if state.get("search_criteria") is not None and state.get("filters") is not None:
+        # Triage already extracted filters and user context for this recommendation request
+        logger.info("Using filters from triage, skipping validation call")
+    else:
+        validation_result = await validation_agent.validate(state["current_input"])
+        state["filters"] = validation_result.get("extracted_filters", {})
+        state["user_context"] = validation_result.get("extracted_user_context", {})
+
+    # If this is a recommendation request, map the search criteria from triage to filters for downstream use
+    criteria_json = state.get("search_criteria")
+    if state.get("is_recommendation_request") and criteria_json:
+        if state["filters"] is None:
+            state["filters"] = {}
             
-            # Find JSON object in the text using regex
-            json_match = re.search(r'\{[\s\S]*\}', criteria_text)
-            if json_match:
-                criteria_json = json.loads(json_match.group(0))
-                state["search_criteria"] = criteria_json
-                logging.info(f"Extracted search criteria: {criteria_json}")
-                
-                # Add to filters for downstream use
-                if state["filters"] is None:
-                    state["filters"] = {}
-                    
-                # Map the structured criteria to filters
-                if criteria_json.get("price_max"):
-                    state["filters"]["price_max"] = criteria_json["price_max"]
-                if criteria_json.get("location"):
-                    state["filters"]["location"] = criteria_json["location"]
-                if criteria_json.get("property_type"):
-                    state["filters"]["property_type"] = criteria_json["property_type"]
-        except Exception as e:
-            logging.error(f"Error parsing search criteria: {e}")
-            state["search_criteria"] = None
+        # Map the structured criteria to filters
+        if criteria_json.get("price_max"):
+            state["filters"]["price_max"] = criteria_json["price_max"]
+        if criteria_json.get("location"):
+            state["filters"]["location"] = criteria_json["location"]
+        if criteria_json.get("property_type"):
+            state["filters"]["property_type"] = criteria_json["property_type"]
 
     # Extract property name from input, using filters or direct detection
     extracted_name = state["filters"].get('name', None)
     if not extracted_name:
-        # Check for River Park directly in the current input
-        if "river park" in state["current_input"].lower():
-            state["target_property_name"] = "River Park Bangsar South"
+        # Check for known property aliases directly in the current input
+        for alias_re, canonical_name in _KNOWN_PROPERTY_ALIAS_RES:
+            if alias_re.search(state["current_input"]):
+                state["target_property_name"] = canonical_name
+                break
     else:
         state["target_property_name"] = str(extracted_name)
 
@@ -198,28 +323,28 @@ def decide_after_existence_check(state: AgentState) -> str:
     Determine next step after property identification.
     
     Logic:
-    1. For recommendation requests, always use RAG (perform_similarity_search)
+    1. For recommendation requests, always use RAG (perform_searches_parallel)
     2. For specific property queries:
-       a. If we have relevant properties from RAG, use them (perform_similarity_search)
-       b. If we don't have relevant properties, try web search (should_perform_web_search)
-    3. For general property queries, use RAG first (perform_similarity_search)
+       a. If we have relevant properties from RAG, use them (perform_searches_parallel)
+       b. If we don't have relevant properties, also use the web search (perform_searches_parallel)
+    3. For general property queries, use RAG first (perform_searches_parallel)
     """
     # For recommendation requests, we want to search our database first
     if state.get("is_recommendation_request"):
-        logging.info("Recommendation request detected, routing to perform_similarity_search")
-        return "perform_similarity_search"
+        logger.info("Recommendation request detected, routing to perform_searches_parallel")
+        return "perform_searches_parallel"
     
     # For specific property queries, check if we have any data
     if state.get("target_property_name"):
         # We'll use the RAG system first to see if we have information
-        # The should_perform_web_search node will later decide if web search is needed
+        # should_perform_web_search will later decide if web search is needed
         # based on the RAG results and the specific question
-        logging.info(f"Specific property '{state.get('target_property_name')}' identified, routing to perform_similarity_search")
-        return "perform_similarity_search"
+        logger.info("Specific property '%s' identified, routing to perform_searches_parallel", state.get('target_property_name'))
+        return "perform_searches_parallel"
     
     # For general property queries without a specific target, use RAG
-    logging.info("No specific target property identified, routing to perform_similarity_search for general RAG")
-    return "perform_similarity_search"
+    logger.info("No specific target property identified, routing to perform_searches_parallel for general RAG")
+    return "perform_searches_parallel"
 
 async def perform_similarity_search(state: AgentState) -> AgentState:
     """
@@ -235,9 +360,9 @@ async def perform_similarity_search(state: AgentState) -> AgentState:
     if state.get("target_property_name"):
         original_query = query_for_search
         query_for_search = f"{state['target_property_name']} {query_for_search}"
-        logging.info(f"Enhanced search query from '{original_query}' to '{query_for_search}' using target property name")
+        logger.info("Enhanced search query from '%s' to '%s' using target property name", original_query, query_for_search)
 
-    logging.info(f"Performing similarity search with query: '{query_for_search}'")
+    logger.info("Performing similarity search with query: '%s'", query_for_search)
     state["relevant_properties"] = await data_source_agent.search_similar_properties(
         query=query_for_search,
         filters=filters_for_search,
@@ -246,14 +371,15 @@ async def perform_similarity_search(state: AgentState) -> AgentState:
     
     # Log whether we found any properties and how many
     if state["relevant_properties"]:
-        logging.info(f"Similarity search found {len(state['relevant_properties'])} properties")
-        # Log the first few property names for debugging
-        property_names = [getattr(prop, 'name', 'Unknown') for prop in state["relevant_properties"][:3]]
-        if len(state["relevant_properties"]) > 3:
-            property_names.append(f"...and {len(state['relevant_properties']) - 3} more")
-        logging.info(f"Found properties: {', '.join(property_names)}")
+        logger.info("Similarity search found %d properties", len(state['relevant_properties']))
+        # Log the first few property names for debugging, skipping the string building when INFO is off
+        if logger.isEnabledFor(logging.INFO):
+            property_names = [prop.property_desc[:40] for prop in state["relevant_properties"][:3]]
+            if len(state["relevant_properties"]) > 3:
+                property_names.append(f"...and {len(state['relevant_properties']) - 3} more")
+            logger.info("Found properties: %s", ', '.join(property_names))
     else:
-        logging.info("Similarity search found no properties")
+        logger.info("Similarity search found no properties")
         
     return state
 
@@ -271,19 +397,18 @@ async def should_perform_web_search(state: AgentState) -> AgentState:
     """
     if not state["is_property_query"]:
         state["web_search_decision"] = "skip"
-        logging.info("Not a property query, web search decision: skip.")
+        logger.info("Not a property query, web search decision: skip.")
         return state
 
     # Force web search if there's a specific property mentioned but no relevant properties from RAG
     if state.get("target_property_name") and not state.get("relevant_properties"):
         state["web_search_decision"] = "web_search"
-        logging.info(f"Specific property '{state.get('target_property_name')}' mentioned but no relevant properties found in RAG, forcing web search.")
+        logger.info("Specific property '%s' mentioned but no relevant properties found in RAG, forcing web search.", state.get('target_property_name'))
         return state
 
     query_for_decision = state["current_input"]  # Always use current input
     
-    chat_history_list = [f'{msg.type}: {msg.content}' for msg in state.get("chat_history", [])]
-    chat_history_str = '\n'.join(chat_history_list)
+    chat_history_str = state.get("chat_history_str", "")
     
     # Prepare relevant_properties string for the prompt
     relevant_properties_str = "None"
@@ -291,11 +416,9 @@ async def should_perform_web_search(state: AgentState) -> AgentState:
         # Summarize properties to keep the prompt concise, avoid stringifying large objects directly
         props_summary = []
         for prop in state["relevant_properties"][:3]: # Show first 3 properties
-            # Ensure attributes exist before accessing
-            name = getattr(prop, 'name', 'N/A')
-            price = getattr(prop, 'price', 'N/A')
-            size = getattr(prop, 'size', 'N/A')
-            props_summary.append(f"- {name} (Price: {price}, Size: {size})")
+            # Property has no name/size fields; use its description and the floor size from prop_details
+            size = prop.prop_details.get('floorSize') or 'N/A'
+            props_summary.append(f"- {prop.property_desc[:40]} (Price: {prop.price}, Size: {size})")
         if len(state["relevant_properties"]) > 3:
             props_summary.append(f"...and {len(state['relevant_properties']) - 3} more.")
         relevant_properties_str = '\n'.join(props_summary)
@@ -307,7 +430,13 @@ async def should_perform_web_search(state: AgentState) -> AgentState:
         relevant_properties_str=relevant_properties_str
     )
     
-    decision_message = await validation_agent.llm.ainvoke(decision_prompt)
+    # Everything except the current input (the last chat message) must match for a cache hit
+    decision_context = '\n'.join([
+        chat_history_str.removesuffix(f"human: {query_for_decision}"),
+        str(state.get("target_property_name")),
+        relevant_properties_str
+    ])
+    decision_message = await cached_llm(decision_prompt, "web_search_decision", decision_context, query_for_decision)
     
     decision_content = ""
     if hasattr(decision_message, 'content'):
@@ -317,20 +446,24 @@ async def should_perform_web_search(state: AgentState) -> AgentState:
         decision_content = str(decision_message).strip().lower()
     
     state["web_search_decision"] = "web_search" if "web_search" in decision_content else "skip"
-    logging.info(f"Web search final decision: {state['web_search_decision']}")
+    logger.info("Web search final decision: %s", state['web_search_decision'])
 
     # Force web search if no relevant properties from RAG and it's a property query
     # (This is a fallback in case the early check for target_property_name didn't catch it)
     if not state.get('relevant_properties') and state["is_property_query"]:
         state['web_search_decision'] = 'web_search'
-        logging.info('No relevant properties found in RAG for a property query, forcing web search.')
+        logger.info('No relevant properties found in RAG for a property query, forcing web search.')
         return state
 
     return state
 
-async def perform_web_search(state: AgentState) -> AgentState:
-    """Perform web search to gather additional information."""
-    logging.info("--- Performing Web Search --- Node triggered.")
+async def perform_web_search(state: AgentState) -> Optional[Dict]:
+    """
+    Perform web search to gather additional information.
+    
+    Only reads the state, so it can run speculatively before the web search decision is made.
+    """
+    logger.info("--- Performing Web Search --- triggered.")
     search_query = state["current_input"]  # Start with current input
     location_filter = state.get('filters', {}).get('location')
     
@@ -341,19 +474,19 @@ async def perform_web_search(state: AgentState) -> AgentState:
         # Add property name if available
         if context.get("referenced_property") and context.get("referenced_property") not in search_query:
             search_query = f"{context.get('referenced_property')} {search_query}"
-            logging.info(f"Added property context to search query: {context.get('referenced_property')}")
+            logger.info("Added property context to search query: %s", context.get('referenced_property'))
         
         # Add location if available and not already in filters
         if context.get("referenced_location") and not location_filter:
             location_filter = context.get("referenced_location")
-            logging.info(f"Added location context to search: {location_filter}")
+            logger.info("Added location context to search: %s", location_filter)
         
         # Add features if relevant
         if context.get("referenced_features") and len(context.get("referenced_features")) > 0:
             features_str = " ".join(context.get("referenced_features"))
             if features_str not in search_query:
                 search_query = f"{search_query} {features_str}"
-                logging.info(f"Added feature context to search query: {features_str}")
+                logger.info("Added feature context to search query: %s", features_str)
     
     # If this is a recommendation request, format the search query specifically for property listings
     if state.get("is_recommendation_request") and state.get("search_criteria"):
@@ -381,23 +514,69 @@ async def perform_web_search(state: AgentState) -> AgentState:
                 psf_range += f"below RM{criteria.get('psf_max')} per square foot "
             search_query += psf_range
         
-        logging.info(f"Formatted recommendation search query: {search_query}")
+        logger.info("Formatted recommendation search query: %s", search_query)
     # Optionally include target property name for context if it exists and this is not a recommendation request
     elif state.get("target_property_name") and state.get("target_property_name") not in search_query:
         search_query = f"{state['target_property_name']} {search_query}"
     
-    logging.info(f"Search Query for Web: {search_query}, Location: {location_filter}")
+    logger.info("Search Query for Web: %s, Location: %s", search_query, location_filter)
 
     if not search_query:
-        logging.warning("Web search triggered but search_query is empty.")
-        state["web_search_result"] = {"error": "Empty search query"}
-        return state
+        logger.warning("Web search triggered but search_query is empty.")
+        return {"error": "Empty search query"}
+        
+    # Location and property type act as exact-match tags; only the query text is compared by embedding
+    cache_context = f"{location_filter}|{(state.get('filters') or {}).get('property_type')}"
+    query_embedding = embed_for_cache(search_query)
+    if query_embedding is not None:
+        cached_result = web_search_cache.check("web_search", cache_context, search_query, query_embedding)
+        if cached_result is not None:
+            logger.info("Semantic cache hit for web search")
+            return cached_result
+    
+    web_search_result = await web_search_agent.search_web(search_query, location_filter)
+    if query_embedding is not None and web_search_result is not None:
+        web_search_cache.store("web_search", cache_context, search_query, query_embedding, web_search_result)
+    logger.info(
+        "Web search result obtained (summary/keys): %s",
+        web_search_result.keys() if isinstance(web_search_result, dict) else 'Result not a dict'
+    )
+    return web_search_result
+
+async def perform_searches_parallel(state: AgentState) -> AgentState:
+    """
+    Run the RAG similarity search and the web search concurrently.
+    
+    The web search query only depends on state that is known before the RAG search, so the web
+    search starts speculatively alongside it. Once the RAG results are in, should_perform_web_search
+    decides whether the web results are needed; if not, the web search is cancelled.
+    """
+    web_task = asyncio.create_task(perform_web_search(state))
+    web_task_awaited = False
+    try:
+        await perform_similarity_search(state)
+        await should_perform_web_search(state)
         
-    state["web_search_result"] = await web_search_agent.search_web(search_query, location_filter)
-    logging.info(f"Web search result obtained (summary/keys): {state['web_search_result'].keys() if isinstance(state['web_search_result'], dict) else 'Result not a dict'}")
+        if state["web_search_decision"] == "web_search":
+            web_task_awaited = True
+            state["web_search_result"] = await web_task
+        else:
+            logger.info("Web search not needed, cancelling speculative web search.")
+    finally:
+        if not web_task_awaited:
+            # Cancel the web search (no-op if it already finished) and wait for it, so a
+            # speculative search that failed is reported here rather than left unretrieved
+            web_task.cancel()
+            try:
+                await web_task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.warning("Speculative web search failed: %s", e)
+    
     return state
 
-async def generate_response(state: AgentState) -> AgentState:
+async def generate_response(state: AgentState, config: RunnableConfig) -> AgentState:
     """Generate the final response using all gathered information."""
     if state["is_property_query"]:
         api_response_data = await response_agent.generate_natural_language_response(
@@ -406,26 +585,23 @@ async def generate_response(state: AgentState) -> AgentState:
             properties=state.get("relevant_properties"),
             web_search_data=state.get("web_search_result"),
             chat_history=state.get("chat_history"),
-            is_recommendation_request=state.get("is_recommendation_request", False)  # Pass the recommendation flag
+            is_recommendation_request=state.get("is_recommendation_request", False),  # Pass the recommendation flag
+            config=config
         )
-        # Assuming api_response_data is already an AgentResponse or dict serializable to it
-        state["response"] = api_response_data.dict() if isinstance(api_response_data, AgentResponse) else api_response_data
+        # Stored as the AgentResponse itself; the endpoint returns it without re-validating
+        state["response"] = api_response_data
         state["chat_history"] = [AIMessage(content=api_response_data.response if isinstance(api_response_data, AgentResponse) else str(api_response_data.get("response")))]
+        state["chat_history_str"] = append_chat_history_str(state.get("chat_history_str", ""), "ai", state["chat_history"][0].content)
     else:
-        last_user_message = ""
-        if state.get("chat_history"):
-            # Get the last human message
-            for msg in reversed(state["chat_history"]):
-                if msg.type == "human":
-                    last_user_message = msg.content
-                    break
         chitchat_response_data = await response_agent.generate_natural_language_response(
             query=state["current_input"],
             chat_history=state.get("chat_history"),
-            is_chitchat=True # Add a flag if ResponseAgent needs it
+            is_chitchat=True, # Add a flag if ResponseAgent needs it
+            config=config
         )
-        state["response"] = chitchat_response_data.dict() if isinstance(chitchat_response_data, AgentResponse) else chitchat_response_data
+        state["response"] = chitchat_response_data
         state["chat_history"] = [AIMessage(content=chitchat_response_data.response if isinstance(chitchat_response_data, AgentResponse) else str(chitchat_response_data.get("response")))]
+        state["chat_history_str"] = append_chat_history_str(state.get("chat_history_str", ""), "ai", state["chat_history"][0].content)
 
     return state
 
@@ -437,9 +613,7 @@ def create_workflow():
     workflow.add_node("classify_input", classify_input_node)
     workflow.add_node("validate_input", validate_input)
     workflow.add_node("check_property_existence", check_property_existence)
-    workflow.add_node("perform_similarity_search", perform_similarity_search)
-    workflow.add_node("should_perform_web_search", should_perform_web_search)
-    workflow.add_node("perform_web_search", perform_web_search)
+    workflow.add_node("perform_searches_parallel", perform_searches_parallel)
     workflow.add_node("generate_response", generate_response)
 
     # Define edges
@@ -462,24 +636,12 @@ def create_workflow():
         "check_property_existence",
         decide_after_existence_check,
         {
-            "perform_similarity_search": "perform_similarity_search",
-            "should_perform_web_search": "should_perform_web_search"
+            "perform_searches_parallel": "perform_searches_parallel"
         }
     )
     
-    # Ensure that after performing a RAG similarity search, we always decide on web search next
-    workflow.add_edge("perform_similarity_search", "should_perform_web_search")
-
-    # Conditional edges based on web search decision
-    workflow.add_conditional_edges(
-        "should_perform_web_search",
-        lambda x: x["web_search_decision"],
-        {
-            "web_search": "perform_web_search", 
-            "skip": "generate_response"
-        }
-    )
-    workflow.add_edge("perform_web_search", "generate_response")
+    # The parallel search node makes the web search decision itself
+    workflow.add_edge("perform_searches_parallel", "generate_response")
     workflow.add_edge("generate_response", END)
 
     # Add checkpointer for memory
@@ -490,6 +652,38 @@ def create_workflow():
 # Create the workflow instance
 workflow_app = create_workflow()
 
+# Per-request state fields and their reset values; current_input and chat_history are added per request
+_INITIAL_STATE_TEMPLATE = {
+    "filters": None,
+    "user_context": None,
+    "relevant_properties": None,
+    "web_search_result": None,
+    "web_search_decision": None,
+    "response": None,
+    # chat_history_str is deliberately absent so the checkpointed transcript carries over
+    "is_property_query": False, # Will be set in classify_input
+    "target_property_name": None,
+    "property_exists": None,
+    "is_recommendation_request": False, # New field
+    "search_criteria": None, # New field
+    "conversation_context": None # New field for tracking context across messages
+}
+
+def build_initial_state(current_input: str) -> AgentState:
+    """Build the per-request workflow state for a new user message."""
+    # Initialize state with the current input and an empty history (or load from checkpointer)
+    # The checkpointer handles loading chat_history if thread_id exists
+    return {
+        **_INITIAL_STATE_TEMPLATE,
+        "current_input": current_input,
+        "chat_history": [] # Checkpointer will populate this if thread_id has history; a fresh list per request
+    }
+
+@lru_cache(maxsize=1024)
+def thread_config(thread_id: str) -> Dict:
+    """Return the (shared, never mutated) run config that points the checkpointer at a conversation thread."""
+    return {"configurable": {"thread_id": thread_id}}
+
 @app.get("/")
 async def root():
     return {"message": "Property Multi-Agent System API"}
@@ -497,54 +691,84 @@ async def root():
 @app.post("/api/property/inquiry", response_model=AgentResponse)
 async def property_inquiry(current_input: str = Body(..., embed=True, alias="query"), thread_id: str = Body(..., embed=True)):
     try:
-        # Initialize state with the current input and an empty history (or load from checkpointer)
-        # The checkpointer handles loading chat_history if thread_id exists
-        initial_state: AgentState = {
-            "current_input": current_input,
-            "filters": None,
-            "user_context": None,
-            "relevant_properties": None,
-            "web_search_result": None,
-            "web_search_decision": None,
-            "response": None,
-            "chat_history": [], # Checkpointer will populate this if thread_id has history
-            "is_property_query": False, # Will be set in classify_input
-            "target_property_name": None,
-            "property_exists": None,
-            "is_recommendation_request": False, # New field
-            "search_criteria": None, # New field
-            "conversation_context": None # New field for tracking context across messages
-        }
+        initial_state = build_initial_state(current_input)
         
         # Execute workflow
         # Pass thread_id in configurable for the checkpointer
-        config = {"configurable": {"thread_id": thread_id}}
-        result_state = await workflow_app.ainvoke(initial_state, config=config)
+        config = thread_config(thread_id)
+        # Checkpoint once when the run finishes instead of after every node; only the final
+        # state (chat_history in particular) is ever read back
+        result_state = await workflow_app.ainvoke(initial_state, config=config, durability="exit")
         
         final_response_data = result_state.get("response")
 
         if final_response_data:
-            # Ensure the response matches AgentResponse schema
-            if isinstance(final_response_data, dict):
+            if isinstance(final_response_data, AgentResponse):
+                return final_response_data
+            # Legacy path: ensure a dict response matches AgentResponse schema
+            elif isinstance(final_response_data, dict):
                 try:
                     return AgentResponse(**final_response_data)
                 except Exception as pydantic_exc:
-                    print(f"Pydantic validation error for final response: {pydantic_exc}")
-                    print(f"Data was: {final_response_data}")
+                    logger.error("Pydantic validation error for final response: %s, data=%s", pydantic_exc, final_response_data)
                     # Fallback or re-raise, depending on desired error handling
                     raise HTTPException(status_code=500, detail="Error formatting final response.")
-
-            elif isinstance(final_response_data, AgentResponse):
-                return final_response_data
             else:
                 raise HTTPException(status_code=500, detail="Invalid response format from workflow.")
         else:
             raise HTTPException(status_code=500, detail="No response generated by the workflow.")
         
     except Exception as e:
-        print(traceback.format_exc())
+        logger.exception("property_inquiry failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data) -> str:
+    """Format a single Server-Sent Event with a JSON payload."""
+    payload = orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return f"event: {event}\ndata: {payload}\n\n"
+
+async def stream_inquiry_events(current_input: str, thread_id: str):
+    """
+    Run the workflow and yield its output as Server-Sent Events.
+
+    Emits a "token" event for each chunk of the final answer as the LLM generates it,
+    then a "response" event with the full AgentResponse, or an "error" event on failure.
+    """
+    config = thread_config(thread_id)
+    final_response_data = None
+    try:
+        async for mode, chunk in workflow_app.astream(
+            build_initial_state(current_input), config=config, stream_mode=["messages", "values"], durability="exit"
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                # Only the answer's LLM chunks are streamed; other nodes' LLM calls (classification, validation)
+                # are internal, and the complete AIMessage appended to chat_history is sent as "response" below
+                if (
+                    isinstance(message, AIMessageChunk)
+                    and metadata.get("langgraph_node") == "generate_response"
+                    and message.content
+                ):
+                    yield format_sse("token", message.content)
+            else:
+                final_response_data = chunk.get("response")
+
+        if final_response_data:
+            if not isinstance(final_response_data, AgentResponse):
+                final_response_data = AgentResponse(**final_response_data)
+            yield format_sse("response", final_response_data.model_dump(mode="json"))
+        else:
+            yield format_sse("error", {"detail": "No response generated by the workflow."})
+
+    except Exception as e:
+        logger.exception("property_inquiry_stream failed")
+        yield format_sse("error", {"detail": str(e)})
+
+@app.post("/api/property/inquiry/stream")
+async def property_inquiry_stream(current_input: str = Body(..., embed=True, alias="query"), thread_id: str = Body(..., embed=True)):
+    """Streaming variant of /api/property/inquiry that sends the answer as Server-Sent Events."""
+    return StreamingResponse(stream_inquiry_events(current_input, thread_id), media_type="text/event-stream")
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field, validator
+import orjson
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 from typing import Dict, List, Optional
 
 class PropertyQuery(BaseModel):
@@ -6,6 +8,9 @@ class PropertyQuery(BaseModel):
 
 
 class Property(BaseModel):
+    # Instances are shared across requests (see DataSourceAgent), so they are immutable
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     property_desc: str
     address: str
     price: int
@@ -14,13 +19,25 @@ class Property(BaseModel):
     link: str
     agent_desc: Optional[str] = None
 
-    @validator('price')
+    _cached_json: Optional[str] = PrivateAttr(default=None)
+
+    @field_validator('price')
+    @classmethod
     def validate_price(cls, value):
         if value <= 0:
             raise ValueError("Price must be positive")
         return round(value, 2)
+
+    @property
+    def cached_json(self) -> str:
+        """Compact JSON for this property, serialized on first access and reused afterwards."""
+        if self._cached_json is None:
+            self._cached_json = orjson.dumps(self.model_dump()).decode()
+        return self._cached_json
     
 class AgentResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     response: str = Field(..., description="Natural language response to the user's query")
     relevant_properties: List[Property] = Field(..., description="List of relevant properties")
     additional_info: Optional[Dict] = Field(default_factory=dict, description="Additional information from agents") 
\ No newline at end of file
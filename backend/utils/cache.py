@@ -0,0 +1,150 @@
+"""
+Caching helpers for the Property Multi-Agent System.
+
+Repeated user queries would otherwise hit the OpenAI API (validation, web search) or the
+sentence encoder again. The helpers here key results on the normalized query so that
+repeats are served from an in-process LRU cache with a TTL. SemanticCache extends this to
+paraphrased queries by comparing query embeddings.
+"""
+
+import copy
+import functools
+import re
+
+import numpy as np
+from cachetools import TTLCache
+
+# Defaults shared by every query cache in the system
+QUERY_CACHE_MAXSIZE = 1024
+QUERY_CACHE_TTL = 600
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a user query for use as a cache key.
+
+    Args:
+        query: The raw user query
+
+    Returns:
+        The query lowercased, stripped and with runs of whitespace collapsed
+    """
+    return _WHITESPACE_RE.sub(" ", query.strip().lower())
+
+
+def _freeze(value):
+    """Convert dicts and lists into hashable equivalents so they can be part of a cache key."""
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def async_query_cache(maxsize: int = QUERY_CACHE_MAXSIZE, ttl: int = QUERY_CACHE_TTL):
+    """
+    Cache the results of an async agent method whose first argument is a user query.
+
+    Results are keyed on the normalized query plus the remaining arguments and are deep
+    copied on the way in and out, so callers can freely mutate what they get back.
+    None results (failed calls) are not cached.
+
+    Args:
+        maxsize: Maximum number of cached results
+        ttl: Seconds a cached result stays valid
+
+    Returns:
+        A decorator for methods with the signature (self, query, *args, **kwargs)
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @functools.wraps(func)
+        async def wrapper(self, query, *args, **kwargs):
+            key = (normalize_query(query), _freeze(args), _freeze(kwargs))
+            # Lookups and stores never await, so they are atomic on the event loop
+            cached = cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+            result = await func(self, query, *args, **kwargs)
+            if result is not None:
+                cache[key] = copy.deepcopy(result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+# Numbers in a query, with an optional k/m/million suffix: "RM1.2m", "500,000", "3"
+_NUMBER_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(k|mil(?:lion)?|m)?\b', re.IGNORECASE)
+
+
+def _number_signature(query: str) -> tuple:
+    """Return the sorted numbers in a query, with k/m suffixes expanded, e.g. "under 1.2m" -> (1200000.0,)."""
+    numbers = []
+    for digits, suffix in _NUMBER_RE.findall(query):
+        number = float(digits.replace(',', ''))
+        suffix = suffix.lower()
+        if suffix == "k":
+            number *= 1_000
+        elif suffix:
+            number *= 1_000_000
+        numbers.append(number)
+    return tuple(sorted(numbers))
+
+
+class SemanticCache:
+    """
+    In-process cache of LLM replies looked up by query embedding.
+
+    A cached reply is reused when the new query's embedding is within distance_threshold
+    (cosine distance) of a cached query's embedding and, in addition:
+    - the namespace and context (the non-query parts of the prompt) match exactly, and
+    - both queries contain the same numbers, since paraphrases such as "under 500k" and
+      "under 600k" are close in embedding space but must not share a reply.
+    """
+
+    def __init__(self, distance_threshold: float = 0.1, ttl: int = 3600, maxsize: int = QUERY_CACHE_MAXSIZE):
+        self.distance_threshold = distance_threshold
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def check(self, namespace: str, context: str, query: str, embedding: np.ndarray):
+        """
+        Look up a reply for a semantically equivalent query.
+
+        Args:
+            namespace: Name of the prompt the reply was generated from
+            context: The prompt's other inputs, which must match exactly
+            query: The user query
+            embedding: L2-normalized embedding of the query
+
+        Returns:
+            The cached reply, or None on a miss
+        """
+        signature = _number_signature(query)
+        best_reply, best_similarity = None, 1.0 - self.distance_threshold
+        for (entry_namespace, entry_context, _), (entry_embedding, entry_signature, reply) in list(self._entries.items()):
+            if entry_namespace != namespace or entry_context != context or entry_signature != signature:
+                continue
+            similarity = float(np.dot(entry_embedding, embedding))
+            if similarity >= best_similarity:
+                best_reply, best_similarity = reply, similarity
+        return best_reply
+
+    def store(self, namespace: str, context: str, query: str, embedding: np.ndarray, reply) -> None:
+        """
+        Cache a reply for a query.
+
+        Args:
+            namespace: Name of the prompt the reply was generated from
+            context: The prompt's other inputs, which must match exactly
+            query: The user query
+            embedding: L2-normalized embedding of the query
+            reply: The LLM reply to cache
+        """
+        self._entries[(namespace, context, normalize_query(query))] = (embedding, _number_signature(query), reply)
@@ -0,0 +1,51 @@
+"""
+Helpers for parsing JSON out of LLM replies.
+"""
+
+import json
+import re
+from typing import Dict, Optional
+
+import orjson
+
+# First {...} block in an LLM reply, with or without ```json fences or prose around it
+_JSON_RE = re.compile(r'\{[\s\S]*\}')
+
+
+def _loads(text: str):
+    """Parse JSON with orjson, falling back to the stdlib parser for NaN/Infinity and integers beyond 64 bits."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
+def extract_json(text: str) -> Optional[Dict]:
+    """
+    Parse the JSON object in an LLM reply.
+
+    Replies that are pure JSON are parsed directly; otherwise the first {...} block is extracted.
+
+    Args:
+        text: The raw reply content
+
+    Returns:
+        The parsed object, or None if the reply contains no parseable JSON object
+    """
+    text = text.strip()
+    try:
+        # Fast path: most replies are a bare JSON object
+        parsed = orjson.loads(text)
+        if isinstance(parsed, dict):
+            return parsed
+    except orjson.JSONDecodeError:
+        pass
+
+    match = _JSON_RE.search(text)
+    if match is None:
+        return None
+    try:
+        parsed = _loads(match.group(0))
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
@@ -4,83 +4,91 @@ Prompts used by the Property Multi-Agent System.
 This module contains all the prompts used by the various agents and nodes in the workflow.
 """
 
-# Prompt for extracting context from previous messages in a conversation
-CONTEXT_EXTRACTION_PROMPT = """
-Review this conversation history and the current query to determine if the current query is a follow-up question that needs context from previous messages.
+from string import Formatter
+
+
+class CompiledPrompt:
+    """
+    A prompt template split into static text and placeholders once, at import time.
+    
+    format() joins the precomputed chunks with the given values instead of re-parsing the
+    template on every call, and produces the same text as str.format.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        # Alternating static text and placeholder names. Formatter.parse unescapes "{{" / "}}"
+        # but splits the text around them, so consecutive literals are merged.
+        chunks = [""]
+        for literal_text, field_name, _, _ in Formatter().parse(template):
+            chunks[-1] += literal_text
+            if field_name is not None:
+                chunks.extend([field_name, ""])
+        self._chunks = tuple(chunks)
+
+    def format(self, **kwargs) -> str:
+        """Render the prompt with the given placeholder values."""
+        parts = list(self._chunks)
+        # Placeholder names sit at the odd positions
+        for i in range(1, len(parts), 2):
+            parts[i] = str(kwargs[parts[i]])
+        return "".join(parts)
+
+# Single triage prompt: follow-up context, query classification and, for recommendation
+# requests, search criteria, all returned in one JSON object from one LLM call
+UNIFIED_TRIAGE_PROMPT = CompiledPrompt("""
+Analyze the user's current message in the context of the conversation so far.
 
 Conversation history:
 {conversation_history}
 
-Current query: "{current_query}"
-
-If the current query seems to be a follow-up or references something mentioned earlier:
-1. Extract any specific property names mentioned in the conversation
-2. Extract any locations mentioned in the conversation
-3. Extract any specific features or criteria mentioned in the conversation
-
-Return ONLY a JSON object with this format:
-{{
-  "is_follow_up": true/false,
-  "referenced_property": "property name or null",
-  "referenced_location": "location or null",
-  "referenced_features": ["feature1", "feature2"] or []
-}}
-"""
-
-# Prompt for classifying if a query is property-related and/or a recommendation request
-QUERY_CLASSIFICATION_PROMPT = """
-Analyze the following user message and classify it:
-
-User message: "{user_message}"
+Current message: "{user_message}"
 
 Instructions:
-1. Determine if this message is asking about property/real estate (apartments, condos, houses, rentals, etc.)
-2. Also determine if this is a RECOMMENDATION REQUEST where the user is asking for property suggestions based on criteria
+1. "property": true if the current message is asking about property/real estate (apartments, condos, houses, rentals, etc.), otherwise false.
+2. "recommendation": true if this is a RECOMMENDATION REQUEST where the user is asking for property suggestions based on criteria, otherwise false.
    Examples of recommendation requests:
    - "Help me find properties under 500k in Bangsar"
    - "What condos are available near KL with 2 bedrooms?"
    - "Recommend affordable properties in Mont Kiara"
    - "Show me properties with good investment potential"
-
-Return your classification in this exact format:
-PROPERTY: yes/no
-RECOMMENDATION: yes/no
-"""
-
-# Prompt for extracting search criteria from a recommendation request
-SEARCH_CRITERIA_PROMPT = """
-Extract detailed property search criteria from this request:
-
-User request: "{user_request}"
-
-Extract the following parameters (use null if not specified):
-1. Price range (min-max or under/over X)
-2. Location/area
-3. Property type (condo, apartment, house, etc.)
-4. Size (square feet/meters)
-5. Number of bedrooms
-6. Number of bathrooms
-7. Other amenities or features
-8. Price per square foot/meter (if mentioned)
+3. "follow_up": true if the current message is a follow-up question that needs context from the conversation history. If so:
+   - "referenced_property": any specific property name mentioned in the conversation, or null
+   - "referenced_location": any location mentioned in the conversation, or null
+   - "referenced_features": any specific features or criteria mentioned in the conversation, or []
+4. "search_criteria": ONLY if "recommendation" is true, extract the detailed search criteria below (use null if not specified); otherwise null.
+5. "filters" and "user_context": ONLY if "recommendation" is true; otherwise null.
+   - "filters": key filters such as location, property type, price range, number of bedrooms, number of bathrooms, size requirements and other specific features
+   - "user_context": preferred areas, budget range, must-have features and any other preferences or constraints
 
 Return ONLY a valid JSON object like this:
 {{
-  "price_min": null or number,
-  "price_max": null or number,
-  "location": "area name or null",
-  "property_type": "type or null",
-  "size_min": null or number,
-  "size_max": null or number,
-  "bedrooms": null or number,
-  "bathrooms": null or number,
-  "psf_min": null or number,
-  "psf_max": null or number,
-  "amenities": ["feature1", "feature2"] or []
+  "property": true/false,
+  "recommendation": true/false,
+  "follow_up": true/false,
+  "referenced_property": "property name or null",
+  "referenced_location": "location or null",
+  "referenced_features": ["feature1", "feature2"] or [],
+  "search_criteria": {{
+    "price_min": null or number,
+    "price_max": null or number,
+    "location": "area name or null",
+    "property_type": "type or null",
+    "size_min": null or number,
+    "size_max": null or number,
+    "bedrooms": null or number,
+    "bathrooms": null or number,
+    "psf_min": null or number,
+    "psf_max": null or number,
+    "amenities": ["feature1", "feature2"] or []
+  }} or null,
+  "filters": {{"location": "...", "property_type": "...", "...": "..."}} or null,
+  "user_context": {{"preferred_areas": "...", "budget_range": "...", "...": "..."}} or null
 }}
-"""
+""")
 
 # Prompt for deciding whether to perform a web search
-WEB_SEARCH_DECISION_PROMPT = """
+WEB_SEARCH_DECISION_PROMPT = CompiledPrompt("""
 Based on the following conversation history, identified target property, and available internal data, decide if a web search is needed:
 
 Conversation History:
@@ -120,4 +128,4 @@ Data Found in RAG for the query/target:
 Return: "skip" (Reason: RAG data seems sufficient for this price query)
 
 Based on the Current Query/Topic, Identified Target Property, and Data Found in RAG, your decision (web_search or skip):
-""" 
\ No newline at end of file
+""") 
\ No newline at end of file
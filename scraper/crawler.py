@@ -10,19 +10,25 @@ using both CSS selectors and LLM-based extraction strategies.
 import asyncio
 import logging
 import os
-import json
-from typing import Dict, List, Optional, Set
+import re
+from typing import Dict, List, Optional, Tuple
 from pprint import pprint
 from datetime import datetime
 
+import httpx
+import orjson
 from dotenv import load_dotenv
-from pydantic import BaseModel
-from crawl4ai import AsyncWebCrawler, CacheMode, CrawlerRunConfig, BrowserConfig
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy, LLMExtractionStrategy
+from openai import AsyncOpenAI
+from pydantic import BaseModel, ValidationError
+from selectolax.lexbor import LexborHTMLParser
+from crawl4ai import AsyncWebCrawler, CacheMode, BrowserConfig
+from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 
 from utils.data_cleaner import DataCleaner
 from utils.data_saver import DataSaver
-from utils.url_handler import URLHandler
+from utils.detail_cache import DetailCache
+from utils.seen_store import SeenStore
+from utils.url_handler import get_handler
 
 # Set up logging
 logging.basicConfig(
@@ -41,9 +47,16 @@ CONFIG = {
     "max_pages": 20,  # Maximum number of pages to crawl
     "output_file": "properties",  # Base filename without extension
     "delay_between_pages": 2,  # Delay between page crawls (seconds)
-    "delay_between_properties": 1,  # Delay between property detail crawls (seconds)
+    "max_concurrent_details": 8,  # Maximum property detail pages crawled at once
+    "max_http_connections": 20,  # Connection pool size of the detail page HTTP client
+    "detail_batch_size": 10,  # Property pages sent to the LLM per extraction request
+    "detail_cache_file": "detail_cache.sqlite3",  # Extracted details of previously crawled pages
+    "seen_file": "seen_properties.sqlite3",  # Properties already collected, across runs
 }
 
+# Detail page text is truncated to this many characters before LLM extraction
+MAX_DETAIL_TEXT_CHARS = 8000
+
 
 class Property(BaseModel):
     """
@@ -70,120 +83,227 @@ PROPERTY_LISTING_SCHEMA = {
     ],
 }
 
+# CSS Selectors for the fields of a property's detail page. Pages where any of these
+# come back empty fall back to LLM extraction.
+PROPERTY_DETAIL_SCHEMA = {
+    "name": "Property Detail Extractor",
+    "baseSelector": "body",
+    "fields": [
+        {"name": "description", "selector": "pre.description-content", "type": "text"},
+        {"name": "propertyType", "selector": "div.property-type div.info-value", "type": "text"},
+        {"name": "floorSize", "selector": "div.built-up div.info-value", "type": "text"},
+        {"name": "numberOfBedrooms", "selector": "div.bedrooms div.info-value", "type": "text"},
+        {"name": "numberOfBathrooms", "selector": "div.bathrooms div.info-value", "type": "text"},
+        {"name": "lotType", "selector": "div.lot-type div.info-value", "type": "text"}
+    ],
+}
+
+# Leading number in a CSS-extracted field, e.g. "1,250 sqft" or "3 Beds"
+DETAIL_NUMBER_RE = re.compile(r'\d[\d,]*')
+
+
+class PropertyBatch(BaseModel):
+    """
+    Data model for a batch of property descriptions extracted by the LLM in one request.
+    """
+    items: List[Property]
+
+
+DETAIL_EXTRACTION_INSTRUCTION = """
+Step 1: Extract the property description and transform it into a well-structured, human-readable paragraph.
+- Use examples to illustrate the desired output format, such as: 'Luxury modern 3 storey bungalow with a private swimming pool located in Country Heights, Kajang, Selangor. The property is fully furnished and features 6 + 1 bedrooms and 8 bathrooms. It has a built-up area of 7,531 sqft and a land area of 6,368 sqft.'
+
+Step 2: Extract the property details as following required fields:
+- propertyType
+- floorSize
+- numberOfBedrooms
+- numberOfBathrooms
+- lotType
+
+The input contains several property pages, each starting with a '### PROPERTY_<n>' header.
+A page is given either as the raw text of its description and detail fields, or as the full page markdown.
+Return a JSON object of the form {"items": [...]} with exactly one item per property page, in the same order as the pages, matching this JSON schema:
+"""
+
+# System prompt for detail extraction; the schema is an immutable class artifact, so serialize it once
+DETAIL_EXTRACTION_SYSTEM_PROMPT = DETAIL_EXTRACTION_INSTRUCTION + orjson.dumps(PropertyBatch.model_json_schema()).decode()
+
 
-def get_llm_strategy() -> LLMExtractionStrategy:
+def get_llm_client() -> AsyncOpenAI:
     """
-    Create and configure the LLM extraction strategy.
+    Create the OpenAI client used for property detail extraction.
     
     Returns:
-        Configured LLM extraction strategy
+        Configured async OpenAI client
     """
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise EnvironmentError("OPENAI_API_KEY environment variable not set")
     
-    return LLMExtractionStrategy(
-        provider="openai/gpt-4o-mini",
-        api_token=api_key,
-        schema=Property.model_json_schema(),
-        extraction_type="schema",
-        instruction=(
-            """
-            Step 1: Extract the property description and transform it into a well-structured, human-readable paragraph.
-            - Use examples to illustrate the desired output format, such as: 'Luxury modern 3 storey bungalow with a private swimming pool located in Country Heights, Kajang, Selangor. The property is fully furnished and features 6 + 1 bedrooms and 8 bathrooms. It has a built-up area of 7,531 sqft and a land area of 6,368 sqft.'
-
-            Step 2: Extract the property details as following required fields:
-            - propertyType
-            - floorSize
-            - numberOfBedrooms
-            - numberOfBathrooms
-            - lotType
-            
-            """
-        ),
-        input_format="markdown",
-        verbose=True,
+    return AsyncOpenAI(api_key=api_key)
+
+
+async def extract_property_details(client: AsyncOpenAI, page_texts: List[str]) -> List[Optional[Dict]]:
+    """
+    Extract property details from several detail pages with a single LLM request.
+    
+    Args:
+        client: OpenAI client
+        page_texts: Text of each property's detail page (field snippets or markdown)
+        
+    Returns:
+        The extracted details for each page, in the same order, with None for pages
+        whose details could not be extracted
+    """
+    pages = "\n\n".join(
+        f"### PROPERTY_{i}\n{text[:MAX_DETAIL_TEXT_CHARS]}"
+        for i, text in enumerate(page_texts)
     )
 
-async def crawl_property_detail(
-    crawler: AsyncWebCrawler, 
-    llm_strategy: LLMExtractionStrategy, 
-    session_id: str,
-    property_url: str
-) -> Optional[List[Dict]]:
+    try:
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": DETAIL_EXTRACTION_SYSTEM_PROMPT},
+                {"role": "user", "content": pages},
+            ],
+        )
+        items = orjson.loads(response.choices[0].message.content).get("items", [])
+    except Exception as e:
+        logger.error(f"Error extracting details for a batch of {len(page_texts)} properties: {e}")
+        return [None] * len(page_texts)
+
+    # Items are matched to pages by position, so a short or long reply can't be trusted
+    if len(items) != len(page_texts):
+        logger.warning(f"LLM returned {len(items)} items for {len(page_texts)} properties. Discarding batch.")
+        return [None] * len(page_texts)
+
+    details = []
+    for item in items:
+        try:
+            details.append(Property.model_validate(item).model_dump())
+        except ValidationError as e:
+            logger.warning(f"Discarding invalid property details: {e}")
+            details.append(None)
+    return details
+
+def format_detail_snippets(raw: Dict) -> str:
     """
-    Crawl a property's detail page to extract additional information.
+    Format the fields extracted with PROPERTY_DETAIL_SCHEMA as short text for the LLM.
+    
+    Args:
+        raw: Text of each detail field as extracted from the page
+        
+    Returns:
+        One 'field: text' line per field that was found
     """
-    js_commands = [
-        # Scroll to ensure the show more button is in view
-        "window.scrollTo(0, document.body.scrollHeight);",
-        # Click the show more button and wait for content to load
-        """
-        (async () => {
-            // Find the show more button using precise selector
-            const showMoreButton = document.querySelector('div.showmore-btn.d-flex > div:first-child');
-            
-            if (showMoreButton && showMoreButton.textContent.trim() === 'Show more') {
-                // Create proper mouse event
-                const clickEvent = new MouseEvent('click', {
-                    bubbles: true,
-                    cancelable: true,
-                    view: window
-                });
-                
-                // Dispatch event on the actual clickable element
-                showMoreButton.dispatchEvent(clickEvent);
-                
-                // Wait for content expansion
-                await new Promise(resolve => {
-                    const observer = new MutationObserver(() => {
-                        const content = document.querySelector('pre.description-content');
-                        if (content && !content.textContent.includes('...')) {
-                            observer.disconnect();
-                            resolve();
-                        }
-                    });
-                    
-                    observer.observe(document.body, {
-                        childList: true,
-                        subtree: true
-                    });
-                    
-                    // Fallback timeout
-                    setTimeout(resolve, 2000);
-                });
-            }
-        })();
-        """
-    ]
+    return "\n".join(f"{field}: {value}" for field, value in raw.items() if value)
+
+def parse_css_details(raw: Dict) -> Optional[Dict]:
+    """
+    Convert the fields extracted with PROPERTY_DETAIL_SCHEMA into property details.
     
-    config = CrawlerRunConfig(
-        # js_code=js_commands,
-        session_id = session_id
-    )
+    Args:
+        raw: Text of each detail field as extracted from the page
+        
+    Returns:
+        The property details, or None if any required field is missing or malformed
+    """
+    if not all(raw.get(field) for field in Property.model_fields):
+        return None
+
+    details = dict(raw)
+    for field in ("floorSize", "numberOfBedrooms", "numberOfBathrooms"):
+        match = DETAIL_NUMBER_RE.search(str(raw.get(field) or ""))
+        if not match:
+            return None
+        details[field] = int(match.group(0).replace(',', ''))
 
     try:
-        logger.info(f"Crawling details for: {property_url}")
-        result = await crawler.arun(
-            url=property_url,
-            extraction_strategy=llm_strategy,
-            # config=config,
-            cache_mode=CacheMode.BYPASS,
+        return Property.model_validate(details).model_dump()
+    except ValidationError:
+        return None
+
+def extract_css_fields(tree: LexborHTMLParser, schema: Dict) -> Dict:
+    """
+    Extract the fields of a JsonCssExtractionStrategy-style schema from a parsed page.
     
-        )
+    Args:
+        tree: Parsed HTML of the page
+        schema: Schema with a baseSelector and text/attribute fields
         
-        # pprint(result.extracted_content)
-        if result.success:
-            description = json.loads(result.extracted_content)
-            return description
+    Returns:
+        The value of each field in the first baseSelector match, None where a field is missing
+    """
+    base = tree.css_first(schema["baseSelector"])
+    if base is None:
+        return {}
+
+    fields = {}
+    for field in schema["fields"]:
+        node = base.css_first(field["selector"])
+        if node is None:
+            fields[field["name"]] = None
+        elif field["type"] == "attribute":
+            fields[field["name"]] = node.attributes.get(field["attribute"])
         else:
-            logger.warning(f"Failed to extract content from {property_url}")
-        return None
+            fields[field["name"]] = node.text(strip=True)
+    return fields
+
+async def crawl_property_detail(
+    client: httpx.AsyncClient,
+    property_url: str,
+    cached: Optional[Dict] = None
+) -> Optional[Tuple[Optional[Dict], str, Dict[str, str]]]:
+    """
+    Fetch a property's detail page over plain HTTP and extract its details with CSS selectors.
+    
+    Detail pages are server-rendered, so they don't need the browser. When the page is in
+    the DetailCache the request is conditional, and a 304 reuses the cached details.
+    
+    Args:
+        client: HTTP client
+        property_url: Detail page URL
+        cached: The page's DetailCache entry, if any
+    
+    Returns:
+        The CSS-extracted details (None if incomplete), the page text for the LLM
+        fallback and the lowercased response headers, or None if the page could not be fetched.
+        The LLM text is the CSS-extracted field snippets when the description was found,
+        and the page's visible text otherwise
+    """
+    headers = {}
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    try:
+        logger.info(f"Crawling details for: {property_url}")
+        response = await client.get(property_url, headers=headers, follow_redirects=True)
+
+        if response.status_code == 304 and cached:
+            logger.info(f"Detail page unchanged, using cached details: {property_url}")
+            return cached['details'], "", {}
+        if response.status_code != 200:
+            logger.warning(f"Failed to extract content from {property_url}: HTTP {response.status_code}")
+            return None
+
+        tree = LexborHTMLParser(response.text)
+        raw = extract_css_fields(tree, PROPERTY_DETAIL_SCHEMA)
+        details = parse_css_details(raw)
+        # The description snippet is a fraction of the page's tokens, so prefer it over the page text
+        if raw.get('description'):
+            llm_text = format_detail_snippets(raw)
+        else:
+            llm_text = tree.body.text(separator="\n", strip=True) if tree.body else ""
+        return details, llm_text, {'etag': response.headers.get('etag'), 'last-modified': response.headers.get('last-modified')}
     except Exception as e:
         logger.error(f"Error crawling detail page {property_url}: {e}")
         return None
 
-
 class PropertyCrawler:
     """Main crawler class for property listings."""
     
@@ -192,8 +312,10 @@ class PropertyCrawler:
         self.config = config
         self.data_cleaner = DataCleaner()
         self.data_saver = DataSaver(self.data_cleaner)
-        self.url_handler = URLHandler()
-        self.seen_properties: Set[str] = set()
+        self.url_handler = get_handler()
+        self.seen_properties = SeenStore(config["seen_file"])
+        self.detail_cache = DetailCache(config["detail_cache_file"])
+        self.llm_client = get_llm_client()
     
     async def crawl_pages(self) -> None:
         """
@@ -206,15 +328,19 @@ class PropertyCrawler:
         # Create CSS-based extraction strategy for property listings
         extraction_strategy = JsonCssExtractionStrategy(PROPERTY_LISTING_SCHEMA, verbose=True)
 
+        # One browser (listing pages), HTTP client (detail pages) and detail semaphore are shared by every page of the crawl
+        session_id = "scrape_listings_session"
+        detail_semaphore = asyncio.Semaphore(self.config["max_concurrent_details"])
+
         logger.info(f"Starting crawler with base URL: {self.config['base_url']}")
         
-        while page_number <= self.config["max_pages"]:
-            current_url = f"{self.config['base_url']}?page={page_number}"
-            logger.info(f"Crawling page {page_number}: {current_url}")
+        http_limits = httpx.Limits(max_connections=self.config["max_http_connections"])
+        async with AsyncWebCrawler(config=BrowserConfig(light_mode=True)) as crawler, \
+                httpx.AsyncClient(limits=http_limits, http2=True, timeout=10) as http_client:
+            while page_number <= self.config["max_pages"]:
+                current_url = f"{self.config['base_url']}?page={page_number}"
+                logger.info(f"Crawling page {page_number}: {current_url}")
 
-            session_id = "scrape_listings_session"
-
-            async with AsyncWebCrawler(config=BrowserConfig(light_mode=True)) as crawler:
                 try:
                     # Get property listings from the current page
                     result = await crawler.arun(
@@ -228,59 +354,85 @@ class PropertyCrawler:
                         logger.error(f"Failed to crawl page {page_number}")
                         break
 
-                    properties = json.loads(result.extracted_content)
+                    properties = orjson.loads(result.extracted_content)
                     logger.info(f"Found {len(properties)} properties on page {page_number}")
 
                     # Filter out properties we've already seen
                     new_properties = []
-                    for prop in properties:
-                        relative_url = prop.get('link')
-                        if relative_url:
-                            full_url = self.url_handler.get_full_url(relative_url)
-                            if relative_url not in self.seen_properties and self.url_handler.is_valid_url(full_url):
-                                prop['link'] = full_url
-                                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                                prop['crawled_at'] = current_time
-                                new_properties.append(prop)
+                    linked = [prop for prop in properties if prop.get('link')]
+                    full_urls = self.url_handler.get_full_urls([prop['link'] for prop in linked])
+                    for prop, full_url in zip(linked, full_urls):
+                        prop['link'] = full_url
+                        if prop not in self.seen_properties and self.url_handler.is_valid_url(full_url):
+                            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            prop['crawled_at'] = current_time
+                            new_properties.append(prop)
 
                     if not new_properties:
                         logger.info("No new properties found. Stopping crawl.")
                         break
 
-                    # Create LLM extraction strategy for property details
-                    llm_strategy = get_llm_strategy()
-
-                    # Process each property's detail page
-                    for prop in new_properties:
-                        property_url = prop.get('link')
-                        if property_url and self.url_handler.is_valid_url(property_url):
-                            # Get additional details from the property's page
-                            details = await crawl_property_detail(crawler, llm_strategy, session_id, property_url)
-
-                            if details:
-                                # Merge listing and detail information
-                                combined_data = {**prop}
-                                if isinstance(details, list) and len(details) > 0:
-                                    description_obj = details[0]
-                                    if 'description' in description_obj:
-                                        combined_data['agent_desc'] = description_obj['description']
-                                        combined_data['propertyType'] = description_obj['propertyType']
-                                        combined_data['floorSize'] = description_obj['floorSize']
-                                        combined_data['numberOfBedrooms'] = description_obj['numberOfBedrooms']
-                                        combined_data['numberOfBathrooms'] = description_obj['numberOfBathrooms']
-                                        combined_data['lotType'] = description_obj['lotType']
-
-                                pprint(combined_data)
-                                all_properties.append(combined_data)
-                                self.seen_properties.add(property_url)
-
-                            # Delay between property detail requests
-                            await asyncio.sleep(self.config["delay_between_properties"])
-
-                    logger.info(f"Page {page_number}: Added {len(new_properties)} new properties with details")
-
-                    # Save progress after each page
-                    self.data_saver.save_all(all_properties, self.config["output_file"])
+                    # Fetch the detail pages concurrently; the semaphore bounds the load on the site
+                    async def fetch_detail(prop: Dict) -> Optional[Tuple[Optional[Dict], str, Dict[str, str]]]:
+                        async with detail_semaphore:
+                            cached = self.detail_cache.get(prop['link'])
+                            return await crawl_property_detail(http_client, prop['link'], cached)
+
+                    detail_props = [
+                        prop for prop in new_properties
+                        if self.url_handler.is_valid_url(prop.get('link'))
+                    ]
+                    crawled = await asyncio.gather(*(fetch_detail(prop) for prop in detail_props))
+
+                    # Use the CSS-extracted details where complete; the rest go to the LLM
+                    extracted = []
+                    llm_pages = []
+                    page_headers = {}
+                    for prop, page in zip(detail_props, crawled):
+                        if page is None:
+                            continue
+                        details, llm_text, page_headers[prop['link']] = page
+                        if details:
+                            extracted.append((prop, details))
+                        elif llm_text:
+                            llm_pages.append((prop, llm_text))
+
+                    # Extract details for several properties per LLM request
+                    if llm_pages:
+                        logger.info(f"CSS extraction incomplete for {len(llm_pages)} properties, falling back to LLM")
+                    batch_size = self.config["detail_batch_size"]
+                    for start in range(0, len(llm_pages), batch_size):
+                        batch = llm_pages[start:start + batch_size]
+                        batch_details = await extract_property_details(self.llm_client, [text for _, text in batch])
+                        extracted.extend((prop, details) for (prop, _), details in zip(batch, batch_details))
+
+                    page_properties = []
+                    for prop, details in extracted:
+                        if details:
+                            # Merge listing and detail information
+                            combined_data = {**prop}
+                            combined_data['agent_desc'] = details['description']
+                            combined_data['propertyType'] = details['propertyType']
+                            combined_data['floorSize'] = details['floorSize']
+                            combined_data['numberOfBedrooms'] = details['numberOfBedrooms']
+                            combined_data['numberOfBathrooms'] = details['numberOfBathrooms']
+                            combined_data['lotType'] = details['lotType']
+
+                            pprint(combined_data)
+                            page_properties.append(combined_data)
+
+                            headers = page_headers[prop['link']]
+                            if headers:
+                                self.detail_cache.store(prop['link'], headers.get('etag'), headers.get('last-modified'), details)
+                            self.seen_properties.add(prop)
+
+                    all_properties.extend(page_properties)
+                    logger.info(f"Page {page_number}: Added {len(page_properties)} new properties with details")
+
+                    # Save progress after each page; the savers append, so pass only this page's records
+                    if page_properties:
+                        self.data_saver.save_all(page_properties, self.config["output_file"])
+                        self.seen_properties.flush()
 
                     page_number += 1
                     await asyncio.sleep(self.config["delay_between_pages"])
@@ -291,6 +443,10 @@ class PropertyCrawler:
 
         logger.info(f"Crawling completed. Total properties collected: {len(all_properties)}")
 
+        # Export the JSON Lines file written during the crawl as a single JSON file
+        self.data_saver.export_json(self.config["output_file"])
+        self.data_saver.autosize_excel_columns(f"{self.config['output_file']}.xlsx")
+
 async def main() -> None:
     """Main entry point for the crawler application."""
     logger.info("Starting property crawler")
@@ -4,6 +4,8 @@ Utils package for property crawler.
 
 from .data_cleaner import DataCleaner
 from .data_saver import DataSaver
-from .url_handler import URLHandler
+from .detail_cache import DetailCache
+from .seen_store import SeenStore
+from .url_handler import URLHandler, get_handler, is_valid_url
 
-__all__ = ['DataCleaner', 'DataSaver', 'URLHandler'] 
\ No newline at end of file
+__all__ = ['DataCleaner', 'DataSaver', 'DetailCache', 'SeenStore', 'URLHandler', 'get_handler', 'is_valid_url'] 
\ No newline at end of file
@@ -13,6 +13,14 @@ from typing import Dict, List, Union
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Patterns for the numeric fields, compiled once for every row and column they are applied to
+_NUM_RE = re.compile(r'([\d,]+)')
+_COUNT_RE = re.compile(r'(\d+)')
+_PRICE_RE = re.compile(r'RM([\d,]+)')
+_PSF_RE = re.compile(r'\(RM\s*([\d,.]+)\s*(?:Psf|PSF|per\s*sqft)?\)')
+# Main price and optional price per sqft, e.g. 'RM341,000(RM 193 Psf)'
+_PRICE_INFO_RE = re.compile(r'RM([\d,]+)(?:\(RM\s*([\d,.]+)\s*(?:Psf|PSF|per\s*sqft)?\))?')
+
 class DataCleaner:
     """Class to handle all data cleaning operations for property data."""
     
@@ -29,7 +37,7 @@ class DataCleaner:
         """Extract numeric value from string."""
         if pd.isna(value) or value is None or value == '- sqft':
             return np.nan
-        match = re.search(r'([\d,]+)', str(value))
+        match = _NUM_RE.search(str(value))
         return float(match.group(1).replace(',', '')) if match else np.nan
     
     @staticmethod
@@ -37,7 +45,7 @@ class DataCleaner:
         """Extract numeric count from string (e.g., for bedrooms/bathrooms)."""
         if pd.isna(value) or value is None:
             return np.nan
-        match = re.search(r'(\d+)', str(value))
+        match = _COUNT_RE.search(str(value))
         return int(match.group(1)) if match else np.nan
     
     @staticmethod
@@ -57,7 +65,7 @@ class DataCleaner:
         
         # Extract main price (handle numbers with commas)
         main_price = np.nan
-        price_match = re.search(r'RM([\d,]+)', price_str)
+        price_match = _PRICE_RE.search(price_str)
         if price_match:
             try:
                 main_price = float(price_match.group(1).replace(',', ''))
@@ -66,7 +74,7 @@ class DataCleaner:
         
         # Extract price per sqft (look for pattern after main price)
         price_per_sqft = np.nan
-        psf_match = re.search(r'\(RM\s*([\d,.]+)\s*(?:Psf|PSF|per\s*sqft)?\)', price_str)
+        psf_match = _PSF_RE.search(price_str)
         if psf_match:
             try:
                 price_per_sqft = float(psf_match.group(1).replace(',', ''))
@@ -75,6 +83,40 @@ class DataCleaner:
             
         return pd.Series([main_price, price_per_sqft])
     
+    @staticmethod
+    def to_number(values: pd.Series) -> pd.Series:
+        """Convert a column of extracted number strings (e.g. '1,000,000') to floats, NaN where missing."""
+        return pd.to_numeric(values.str.replace(',', '', regex=False), errors='coerce')
+    
+    @classmethod
+    def extract_count_column(cls, values: pd.Series) -> pd.Series:
+        """Vectorized extract_count: the first integer in each value of a column."""
+        # Counts extracted by the LLM or CSS parsing are already numbers; only text needs the regex
+        if pd.api.types.is_numeric_dtype(values):
+            return values
+        return cls.to_number(values.astype(str).str.extract(_COUNT_RE, expand=False))
+    
+    @classmethod
+    def standardize_floor_sizes(cls, sizes: pd.Series) -> pd.Series:
+        """
+        Format a column of floor sizes as e.g. '1,200 sqft'.
+        Numbers and numeric strings are formatted, other strings are kept as they are
+        and missing values become '0 sqft'.
+        """
+        if pd.api.types.is_numeric_dtype(sizes):
+            # The common case: the LLM/CSS extraction already produced numbers
+            numeric = sizes
+            is_text = pd.Series(False, index=sizes.index)
+        else:
+            is_text = sizes.str.len().notna()
+            numeric = pd.to_numeric(sizes, errors='coerce')
+            numeric = numeric.fillna(cls.to_number(sizes.where(is_text).astype('string')))
+        
+        formatted = numeric.dropna().map('{:,.0f} sqft'.format)
+        result = sizes.where(is_text, "0 sqft").astype(object)
+        result[formatted.index] = formatted
+        return result
+    
     def clean_data(self, data: List[Dict]) -> pd.DataFrame:
         """Clean and transform property data into a structured DataFrame."""
         from datetime import datetime
@@ -116,26 +158,16 @@ class DataCleaner:
         expanded_df['property_type'] = df['propertyType'].apply(self.standardize_property_type)
         
         # Handle floor size standardization (convert to sqft if needed)
-        def standardize_floor_size(size):
-            if isinstance(size, (int, float)):
-                return f"{size:,.0f} sqft"
-            elif isinstance(size, str):
-                # Remove commas and convert to float if possible
-                try:
-                    return f"{float(size.replace(',', '')):,.0f} sqft"
-                except ValueError:
-                    return size
-            return "0 sqft"
-        
-        expanded_df['floor_size_sqft'] = df['floorSize'].apply(standardize_floor_size)
+        expanded_df['floor_size_sqft'] = self.standardize_floor_sizes(df['floorSize'])
         
         # Clean numeric values
-        expanded_df['num_bedrooms'] = df['numberOfBedrooms'].apply(self.extract_count)
-        expanded_df['num_bathrooms'] = df['numberOfBathrooms'].apply(self.extract_count)
+        expanded_df['num_bedrooms'] = self.extract_count_column(df['numberOfBedrooms'])
+        expanded_df['num_bathrooms'] = self.extract_count_column(df['numberOfBathrooms'])
         
-        # Extract price information
-        expanded_df['asked_price'] = df['price'].apply(lambda x: self.extract_price_info(x)[0])
-        expanded_df['price_per_sqft'] = df['price'].apply(lambda x: self.extract_price_info(x)[1])
+        # Extract price information, both values in one pass over the column
+        prices = df['price'].astype(str).str.extract(_PRICE_INFO_RE)
+        expanded_df['asked_price'] = self.to_number(prices[0])
+        expanded_df['price_per_sqft'] = self.to_number(prices[1])
         
         # Add agent information
         expanded_df['agent'] = df['agent'].fillna('')
@@ -3,9 +3,10 @@ Data saving utilities for property data.
 """
 
 import os
-import json
 import logging
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
+import openpyxl
+import orjson
 import pandas as pd
 from utils.data_cleaner import DataCleaner
 
@@ -18,44 +19,99 @@ class DataSaver:
         """Initialize DataSaver with a DataCleaner instance."""
         self.data_cleaner = data_cleaner
     
-    def save_json(self, data: List[Dict], filename: str) -> None:
+    def save_jsonl(self, data: List[Dict], filename: str) -> None:
         """
-        Save data to JSON file by appending to existing data.
+        Append data to a JSON Lines file, one property per line.
         
         Args:
             data: List of property dictionaries to save
-            filename: Output JSON file path
+            filename: Output JSONL file path
         """
         try:
-            # Read existing data if file exists
-            existing_data = []
-            if os.path.exists(filename) and os.path.getsize(filename) > 0:
-                try:
-                    with open(filename, 'r') as f:
-                        existing_data = json.load(f)
-                        if not isinstance(existing_data, list):
-                            existing_data = []
-                            logger.warning(f"Existing data in {filename} is not a list. Creating new list.")
-                except json.JSONDecodeError:
-                    logger.warning(f"Could not parse existing JSON in {filename}. Creating new list.")
+            with open(filename, 'ab') as f:
+                f.writelines(orjson.dumps(record) + b"\n" for record in data)
+                
+            logger.info(f"Data successfully saved to {filename}")
+            logger.info(f"Appended JSONL records: {len(data)}")
             
-            # Combine existing data with new data
-            combined_data = existing_data + data
+        except Exception as e:
+            logger.error(f"Error saving JSONL data: {e}")
+            raise
+    
+    @staticmethod
+    def load_jsonl(filename: str) -> Iterator[Dict]:
+        """
+        Stream the records of a JSON Lines file.
+        
+        Args:
+            filename: JSONL file path
             
-            # Write combined data back to file
-            with open(filename, 'w') as f:
-                json.dump(combined_data, f, indent=2)
+        Yields:
+            Each property dictionary in the file
+        """
+        if not os.path.exists(filename):
+            return
+        with open(filename, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+    
+    def seed_jsonl(self, base_filename: str) -> None:
+        """
+        Create the JSON Lines file from an existing JSON array file, if only the latter exists.
+        
+        Datasets saved before the switch to JSON Lines live only in the JSON file; copying
+        them over once keeps export_json from replacing them with just the new records.
+        
+        Args:
+            base_filename: Base filename without extension
+        """
+        jsonl_filename = f"{base_filename}.jsonl"
+        json_filename = f"{base_filename}.json"
+        
+        if os.path.exists(jsonl_filename) or not os.path.exists(json_filename) or os.path.getsize(json_filename) == 0:
+            return
+        
+        try:
+            with open(json_filename, 'rb') as f:
+                existing_data = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            logger.warning(f"Could not parse existing JSON in {json_filename}. Not seeding {jsonl_filename}.")
+            return
+        if not isinstance(existing_data, list):
+            logger.warning(f"Existing data in {json_filename} is not a list. Not seeding {jsonl_filename}.")
+            return
+        
+        self.save_jsonl(existing_data, jsonl_filename)
+        logger.info(f"Seeded {jsonl_filename} with {len(existing_data)} records from {json_filename}")
+    
+    def export_json(self, base_filename: str) -> None:
+        """
+        Write every record in the JSONL file to a single JSON array file, for consumers
+        that read the whole dataset at once. Run once at the end of a crawl.
+        
+        Args:
+            base_filename: Base filename without extension
+        """
+        jsonl_filename = f"{base_filename}.jsonl"
+        json_filename = f"{base_filename}.json"
+        
+        try:
+            self.seed_jsonl(base_filename)
+            records = list(self.load_jsonl(jsonl_filename))
+            with open(json_filename, 'wb') as f:
+                f.write(orjson.dumps(records))
                 
-            logger.info(f"Data successfully saved to {filename}")
-            logger.info(f"Total JSON records: {len(combined_data)}")
+            logger.info(f"Data successfully exported to {json_filename}")
+            logger.info(f"Total JSON records: {len(records)}")
             
         except Exception as e:
-            logger.error(f"Error saving JSON data: {e}")
+            logger.error(f"Error exporting JSON data: {e}")
             raise
     
     def save_excel(self, data: List[Dict], filename: str) -> None:
         """
-        Save cleaned data to Excel file, handling appending if file exists.
+        Clean data and append it to an Excel file, creating the file if needed.
         
         Args:
             data: List of property dictionaries to save
@@ -65,53 +121,122 @@ class DataSaver:
             # Clean the data
             cleaned_df = self.data_cleaner.clean_data(data)
             
-            # If file exists, read existing data and append new data
+            # Append only the new rows instead of reading and rewriting the whole workbook
             if os.path.exists(filename):
                 try:
-                    existing_df = pd.read_excel(filename, engine='openpyxl')
-                    combined_df = pd.concat([existing_df, cleaned_df], ignore_index=True)
+                    total_rows = self._append_excel_rows(cleaned_df, filename)
+                    if total_rows is None:
+                        # The sheet lacks some of the new columns; rewrite it with them added
+                        existing_df = pd.read_excel(filename, sheet_name='Properties', engine='openpyxl')
+                        combined_df = pd.concat([existing_df, cleaned_df], ignore_index=True)
+                        combined_df.to_excel(filename, index=False, sheet_name='Properties', engine='openpyxl')
+                        total_rows = len(combined_df)
                 except Exception as e:
-                    logger.warning(f"Could not read existing Excel file: {e}. Creating new file.")
-                    combined_df = cleaned_df
+                    logger.warning(f"Could not append to existing Excel file: {e}. Creating new file.")
+                    cleaned_df.to_excel(filename, index=False, sheet_name='Properties', engine='openpyxl')
+                    total_rows = len(cleaned_df)
             else:
-                combined_df = cleaned_df
-            
-            # Save to Excel with optimized settings
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                combined_df.to_excel(writer, index=False, sheet_name='Properties')
-                
-                # Auto-adjust column widths
-                worksheet = writer.sheets['Properties']
-                for idx, col in enumerate(combined_df.columns):
-                    max_length = max(
-                        combined_df[col].astype(str).apply(len).max(),
-                        len(str(col))
-                    )
-                    # Add a little extra space
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length + 2, 50)
+                cleaned_df.to_excel(filename, index=False, sheet_name='Properties', engine='openpyxl')
+                total_rows = len(cleaned_df)
             
             logger.info(f"Data successfully saved to {filename}")
-            logger.info(f"Total Excel records: {len(combined_df)}")
+            logger.info(f"Total Excel records: {total_rows}")
             
         except Exception as e:
             logger.error(f"Error saving Excel data: {e}")
             raise
     
+    @staticmethod
+    def _append_excel_rows(cleaned_df: pd.DataFrame, filename: str) -> Optional[int]:
+        """
+        Append rows to the Properties sheet of an existing Excel file.
+        
+        openpyxl can't add rows to a saved file in place, so the existing rows are streamed
+        from a read-only workbook into a write-only one followed by the new rows. Neither
+        mode builds the full in-memory worksheet that a regular load_workbook does.
+        The new rows are aligned to the sheet's header by column name.
+        
+        Args:
+            cleaned_df: Cleaned rows to append
+            filename: Excel file path
+            
+        Returns:
+            Total number of records in the file afterwards, or None (file untouched) if the
+            sheet has no header or lacks some of cleaned_df's columns
+        """
+        source = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+        target = openpyxl.Workbook(write_only=True)
+        worksheet = target.create_sheet('Properties')
+        
+        try:
+            existing = source['Properties'].iter_rows(values_only=True)
+            header = next(existing, None)
+            if header is None or not set(cleaned_df.columns) <= set(header):
+                return None
+            
+            worksheet.append(header)
+            existing_rows = 1
+            for row in existing:
+                worksheet.append(row)
+                existing_rows += 1
+        finally:
+            source.close()
+        
+        # Match the existing column order; columns the new rows lack are left empty.
+        # openpyxl writes NaN literally, so missing values become empty cells
+        cleaned_df = cleaned_df.reindex(columns=list(header))
+        rows = cleaned_df.astype(object).where(cleaned_df.notna(), None)
+        for row in rows.itertuples(index=False):
+            worksheet.append(list(row))
+        
+        # Write next to the original and swap, so a failed save leaves the old file intact
+        temp_filename = f"{filename}.tmp"
+        target.save(temp_filename)
+        os.replace(temp_filename, filename)
+        
+        # The header row is not a record
+        return existing_rows - 1 + len(cleaned_df)
+    
+    def autosize_excel_columns(self, filename: str) -> None:
+        """
+        Fit the Excel column widths to their contents. Run once at the end of a crawl.
+        
+        Args:
+            filename: Excel file path
+        """
+        if not os.path.exists(filename):
+            return
+        
+        try:
+            workbook = openpyxl.load_workbook(filename)
+            worksheet = workbook['Properties']
+            for column in worksheet.iter_cols():
+                max_length = max(len(str(cell.value)) for cell in column if cell.value is not None)
+                # Add a little extra space
+                worksheet.column_dimensions[column[0].column_letter].width = min(max_length + 2, 50)
+            workbook.save(filename)
+            
+        except Exception as e:
+            logger.error(f"Error resizing Excel columns: {e}")
+            raise
+    
     def save_all(self, data: List[Dict], base_filename: str) -> None:
         """
-        Save data to both JSON and Excel formats.
+        Append data to both the JSON Lines and Excel files.
         
         Args:
-            data: List of property dictionaries to save
+            data: List of property dictionaries not saved before; each record is cleaned
+                and written once
             base_filename: Base filename without extension
         """
-        json_filename = f"{base_filename}.json"
+        jsonl_filename = f"{base_filename}.jsonl"
         excel_filename = f"{base_filename}.xlsx"
         
         try:
-            self.save_json(data, json_filename)
+            self.seed_jsonl(base_filename)
+            self.save_jsonl(data, jsonl_filename)
             self.save_excel(data, excel_filename)
-            logger.info("Successfully saved data in both JSON and Excel formats")
+            logger.info("Successfully saved data in both JSON Lines and Excel formats")
         except Exception as e:
             logger.error(f"Error saving data: {e}")
             raise 
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Detail page cache for the property crawler.
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+class DetailCache:
+    """
+    SQLite store of extracted property details, keyed by detail page URL.
+
+    Each entry keeps the page's ETag and Last-Modified validators so a re-crawl can
+    ask the server whether the page changed and reuse the extraction if it did not.
+    """
+
+    def __init__(self, db_path: str):
+        """Open (or create) the cache database at db_path."""
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS detail_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                extracted_json TEXT NOT NULL,
+                crawled_at TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Look up the cached extraction for a detail page.
+
+        Args:
+            url: Detail page URL
+
+        Returns:
+            Dict with the page's etag, last_modified and extracted details, or None if not cached
+        """
+        row = self.conn.execute(
+            "SELECT etag, last_modified, extracted_json FROM detail_cache WHERE url = ?",
+            (url,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        etag, last_modified, extracted_json = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'details': orjson.loads(extracted_json)
+        }
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], details: Dict) -> None:
+        """
+        Cache the extracted details of a detail page with its validators.
+
+        Args:
+            url: Detail page URL
+            etag: The page's ETag response header, if any
+            last_modified: The page's Last-Modified response header, if any
+            details: Extracted property details
+        """
+        # Without a validator the page can never be confirmed unchanged, so don't cache it
+        if not etag and not last_modified:
+            return
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO detail_cache VALUES (?, ?, ?, ?, ?)",
+            (url, etag, last_modified, orjson.dumps(details).decode(), datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        """Close the cache database."""
+        self.conn.close()
@@ -0,0 +1,78 @@
+"""
+Persistent record of the properties the crawler has already collected.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+class SeenStore:
+    """
+    SQLite set of SHA-1 hashes of collected properties, kept across crawler runs.
+
+    A property is keyed both by its detail URL and by its listing content (normalized
+    address, price and description), so the same listing re-posted under a different
+    URL is also recognised. The address alone isn't used as the content key: every unit
+    listed in the same building shares it, so distinct listings would be dropped as seen.
+    """
+
+    def __init__(self, db_path: str):
+        """Open (or create) the seen-properties database at db_path."""
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (url_hash TEXT PRIMARY KEY)")
+        self.conn.commit()
+
+    @staticmethod
+    def property_keys(prop: Dict) -> List[str]:
+        """
+        Compute the hashes identifying a property.
+
+        Args:
+            prop: Property listing with at least a link
+
+        Returns:
+            SHA-1 hex digests of the property's URL and, if any of its listing fields is
+            non-empty, of its normalized listing content
+        """
+        keys = [hashlib.sha1(f"url:{prop['link']}".encode()).hexdigest()]
+        
+        fields = [
+            _WHITESPACE_RE.sub(" ", str(prop.get(field) or "")).strip().lower()
+            for field in ("address", "price", "property_desc")
+        ]
+        # Listings whose fields all came back empty would share one content hash and
+        # all look like the first of them, so they are keyed by URL only
+        if any(fields):
+            keys.append(hashlib.sha1(f"content:{'|'.join(fields)}".encode()).hexdigest())
+        return keys
+
+    def __contains__(self, prop: Dict) -> bool:
+        """Check whether a property was collected before, by URL or by content."""
+        keys = self.property_keys(prop)
+        row = self.conn.execute(
+            f"SELECT 1 FROM seen WHERE url_hash IN ({','.join('?' * len(keys))}) LIMIT 1",
+            keys
+        ).fetchone()
+        return row is not None
+
+    def add(self, prop: Dict) -> None:
+        """Record a collected property. Call flush() to persist it."""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO seen VALUES (?)",
+            [(key,) for key in self.property_keys(prop)]
+        )
+
+    def flush(self) -> None:
+        """Persist the properties added since the last flush."""
+        self.conn.commit()
+
+    def close(self) -> None:
+        """Persist pending additions and close the database."""
+        self.conn.commit()
+        self.conn.close()
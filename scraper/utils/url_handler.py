@@ -2,14 +2,199 @@
 URL handling utilities for property crawler.
 """
 
+import functools
+import re
+import sys
+from typing import List, NamedTuple, Optional
 from urllib.parse import urljoin, urlparse
 
+try:
+    # Optional WHATWG URL parser (C++); urljoin is used when it isn't installed
+    from ada_url import join_url as _ada_join_url
+except ImportError:
+    _ada_join_url = None
+
+# Listing pages repeat the same hrefs (cards, pagination, navigation), so URL results are
+# memoized; the bound keeps a long crawl from growing the caches without limit
+URL_CACHE_MAXSIZE = 65536
+
+# Validation results are one bool per URL, so they are cheap to keep more of
+VALID_URL_CACHE_MAXSIZE = 131072
+
+# Site the crawler targets, stored without a trailing slash
+_DEFAULT_BASE = "https://www.edgeprop.my"
+
+# Schemes of nearly every URL the crawler sees, validated without a full parse
+_HTTP_PREFIXES = ("http://", "https://")
+
+# Characters that make urlparse's result differ from a plain look at the authority:
+# brackets (IPv6 hosts, validated by urlparse) and the tab/newline characters it strips
+_SLOW_VALIDATION_RE = re.compile(r'[\[\]\t\n\r]')
+
+# Resolved URLs shorter than this are interned
+_INTERN_MAX_LENGTH = 256
+
+# Absolute URL: an RFC 3986 scheme followed by a non-empty authority. Leading control
+# characters and spaces are allowed, as urlparse strips them before parsing.
+_ABSOLUTE_RE = re.compile(r'[\x00-\x20]*[A-Za-z][A-Za-z0-9+.\-]*://[^/?#]')
+
+# Tab/newline characters, which urlparse and urljoin strip from anywhere in a URL
+_CONTROL_CHAR_RE = re.compile(r'[\t\n\r]')
+
+# Relative URLs that need urljoin: protocol-relative URLs, dot segments, the tab/newline
+# characters urljoin strips and the empty query or fragment it drops ("/a?", "/a#", "/a?#b").
+# Any other path is simply appended to the base.
+_NEEDS_JOIN_RE = re.compile(r'^//|(?:^|/)\.|[\t\n\r]|[?#]$|\?#')
+
+
+class _BaseURL(NamedTuple):
+    """Forms of a handler's base URL used when resolving relative URLs."""
+    url: str        # Without a trailing slash
+    slash: str      # With a trailing slash
+    is_origin: bool # True if the base has no path
+
+
+def _join_url(base_url: str, url: str) -> str:
+    """Resolve url against base_url with ada-url if available, otherwise urljoin."""
+    if _ada_join_url is not None:
+        try:
+            return _ada_join_url(base_url, url)
+        except ValueError:
+            # Not a valid WHATWG URL; resolve it as urljoin always has
+            pass
+    return urljoin(base_url, url)
+
+
+# Resolving against a base without a path is plain concatenation unless urljoin has to
+# normalize the path; each resolver below handles one kind of href
+
+def _resolve_root_relative(base: _BaseURL, url: str) -> str:
+    """Resolve a URL starting with / (root-relative or protocol-relative)."""
+    if base.is_origin and not _NEEDS_JOIN_RE.search(url):
+        return base.url + url
+    return _join_url(base.url, url)
+
+
+def _resolve_relative(base: _BaseURL, url: str) -> str:
+    """Resolve a relative URL that doesn't start with /, treating it as root-relative."""
+    if base.is_origin and not _NEEDS_JOIN_RE.search(url):
+        return base.slash + url
+    return _join_url(base.url, '/' + url)
+
+
+def _resolve_maybe_absolute(base: _BaseURL, url: str) -> str:
+    """Return an absolute URL as is, or resolve a relative one."""
+    if _ABSOLUTE_RE.match(url):
+        return url
+    return _resolve_relative(base, url)
+
+
+def _resolve_maybe_http(base: _BaseURL, url: str) -> str:
+    """Like _resolve_maybe_absolute, recognising http(s) URLs without the regex."""
+    if not url.startswith(_HTTP_PREFIXES):
+        return _resolve_maybe_absolute(base, url)
+    host_start = url.index('//') + 2
+    if len(url) > host_start and url[host_start] not in '/?#':
+        return url
+    return _resolve_relative(base, url)
+
+
+# Resolver by first character of the href; anything else may carry another scheme
+_RESOLVERS = {
+    '/': _resolve_root_relative,
+    'h': _resolve_maybe_http,
+}
+
+
+def _resolve_url(base: _BaseURL, url: str) -> str:
+    """Body of URLHandler.get_full_url, using the precomputed forms of the handler's base URL."""
+    if not url:
+        return ""
+    
+    # urlparse strips tabs and newlines before looking for a host, so such hrefs are
+    # classified by urlparse itself rather than the prefix checks
+    if url[0] != '/' and _CONTROL_CHAR_RE.search(url):
+        return url if urlparse(url).netloc else _resolve_relative(base, url)
+    return _RESOLVERS.get(url[0], _resolve_maybe_absolute)(base, url)
+
+
+@functools.lru_cache(maxsize=URL_CACHE_MAXSIZE)
+def _get_full_url_cached(base: _BaseURL, url: str) -> str:
+    """
+    Memoized, interned URLHandler.get_full_url.
+    
+    Keyed on the base URL forms rather than the handler, so handlers with the same base
+    share entries and the cache holds no references to handlers.
+    """
+    full_url = _resolve_url(base, url)
+    # Different hrefs often resolve to the same URL (relative and absolute forms of one
+    # listing), so share one string for them; very long URLs are rarely repeated
+    if len(full_url) < _INTERN_MAX_LENGTH:
+        return sys.intern(full_url)
+    return full_url
+
+
+def is_valid_url(url: str) -> bool:
+    """
+    Check if URL is valid, i.e. has a scheme and a host. Results are memoized.
+    
+    Args:
+        url: URL to validate
+        
+    Returns:
+        True if URL is valid, False otherwise
+    """
+    # Non-string input (e.g. a missing link, or a list from a malformed extraction) is
+    # invalid rather than an error; checked before the cache, which would hash it
+    if not isinstance(url, str) or not url:
+        return False
+    return _is_valid_url_cached(url)
+
+
+@functools.lru_cache(maxsize=VALID_URL_CACHE_MAXSIZE)
+def _is_valid_url_cached(url: str) -> bool:
+    """Memoized body of is_valid_url, for non-empty strings."""
+    # Fast path for ASCII http(s): valid if the authority after "//" is not empty.
+    # Non-ASCII URLs and those with brackets, tabs or newlines still go through urlparse,
+    # which rejects malformed IPv6 hosts, hosts that NFKC-normalize to URL delimiters and
+    # authorities that are empty once tabs and newlines are stripped.
+    if url.isascii() and url.startswith(_HTTP_PREFIXES) and not _SLOW_VALIDATION_RE.search(url):
+        host_start = url.index('//') + 2
+        return len(url) > host_start and url[host_start] not in '/?#'
+        
+    try:
+        result = urlparse(url)
+    except ValueError:
+        # Malformed bracketed host, e.g. "ftp://[::1"
+        return False
+    return bool(result.scheme and result.netloc)
+
 class URLHandler:
     """Class to handle URL operations."""
+
+    __slots__ = ('base_url', '_base')
     
-    def __init__(self, base_url: str = "https://www.edgeprop.my"):
+    def __init__(self, base_url: str = _DEFAULT_BASE):
         """Initialize URL handler with base URL."""
-        self.base_url = base_url.rstrip('/')  
+        if base_url is not _DEFAULT_BASE:
+            base_url = base_url.rstrip('/')
+        # Instances are immutable (see __setattr__), so attributes are set through object
+        object.__setattr__(self, 'base_url', base_url)
+        # Derived forms of the base URL used when resolving relative URLs
+        object.__setattr__(self, '_base', _BaseURL(base_url, base_url + '/', base_url.count('/') == 2))
+    
+    def __setattr__(self, name: str, value) -> None:
+        """
+        Reject attribute changes.
+        
+        base_url and its precomputed forms must stay consistent; immutability also lets one
+        handler be shared between crawler workers without locking.
+        """
+        raise AttributeError(f"{type(self).__name__} is immutable")
+    
+    def __delattr__(self, name: str) -> None:
+        """Reject attribute deletion; see __setattr__."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
     
     def get_full_url(self, url: str) -> str:
         """
@@ -21,20 +206,21 @@ class URLHandler:
         Returns:
             Absolute URL
         """
-        if not url:
-            return ""
-            
-        # Check if URL is relative (starts with /)
-        if url.startswith('/'):
-            return urljoin(self.base_url, url)
-            
-        # Check if URL is already absolute
-        parsed = urlparse(url)
-        if parsed.netloc:
-            return url
+        return _get_full_url_cached(self._base, url)
+    
+    def get_full_urls(self, urls: List[str]) -> List[str]:
+        """
+        Convert a batch of possibly relative URLs to absolute URLs.
+        
+        Args:
+            urls: URL strings that might be relative
             
-        # If URL doesn't start with / but is still relative
-        return urljoin(self.base_url, '/' + url)
+        Returns:
+            Absolute URLs, in the same order
+        """
+        resolve = _get_full_url_cached
+        base = self._base
+        return [resolve(base, url) for url in urls]
     
     def is_valid_url(self, url: str) -> bool:
         """
@@ -46,11 +232,23 @@ class URLHandler:
         Returns:
             True if URL is valid, False otherwise
         """
-        if not url:
-            return False
-            
-        try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except:
-            return False 
\ No newline at end of file
+        return is_valid_url(url)
+
+
+# Shared handler for the default site; URLHandler is immutable, so it is safe to share
+_default_handler = URLHandler()
+
+
+def get_handler(base_url: Optional[str] = None) -> URLHandler:
+    """
+    Get a URL handler for a base URL, reusing the shared one for the default site.
+    
+    Args:
+        base_url: Base URL to resolve against; None for the default site
+        
+    Returns:
+        URL handler for base_url
+    """
+    if base_url is None or base_url.rstrip('/') == _DEFAULT_BASE:
+        return _default_handler
+    return URLHandler(base_url)